@@ -3,6 +3,7 @@ import numpy as np
 import random
 from faker import Faker
 from tqdm import tqdm
+from src.instrumentation import traced
 
 # --------------------------------------
 # Initialize Faker & Seed for reproducibility
@@ -17,44 +18,55 @@ np.random.seed(42)
 DATA_RAW = r"D:\Data Analytics Project\helthcare_analytics_project\data\raw"
 DATA_PROCESSED = r"D:\Data Analytics Project\helthcare_analytics_project\data\processed"
 
+# Number of rows generated per table at scale factor 1.0
+ROW_COUNTS = {
+    'doctors': 65000,
+    'patients': 100000,
+    'appointments': 300000,
+    'diagnosis': 50000,
+    'emergency_cases': 25000,
+    'insurances': 50000,
+}
+
 # --------------------------------------
 # 1. Hospital Data Generation
 # --------------------------------------
-df_hospitals = pd.read_csv(f"{DATA_RAW}/HospitalsInIndia.csv")
-df_hospitals['hospital_id'] = ['HOSP{:05d}'.format(i) for i in range(len(df_hospitals))]
-df_hospitals['capacity'] = np.random.randint(20, 500, size=len(df_hospitals))
-df_hospitals['emergency_facility'] = np.random.choice(['True', 'False'], size=len(df_hospitals))
-# Move 'hospital_id' to first column
-hospital_id = df_hospitals.pop('hospital_id')
-df_hospitals.insert(0, 'hospital_id', hospital_id)
-df_hospitals.to_csv(f"{DATA_PROCESSED}/hospitals.csv", index=False)
+@traced
+def generate_hospitals(df_hospitals):
+    """Add ids, capacity and emergency facility to the raw hospital list."""
+    df_hospitals = df_hospitals.copy()
+    df_hospitals['hospital_id'] = ['HOSP{:05d}'.format(i) for i in range(len(df_hospitals))]
+    df_hospitals['capacity'] = np.random.randint(20, 500, size=len(df_hospitals))
+    df_hospitals['emergency_facility'] = np.random.choice(['True', 'False'], size=len(df_hospitals))
+    # Move 'hospital_id' to first column
+    hospital_id = df_hospitals.pop('hospital_id')
+    df_hospitals.insert(0, 'hospital_id', hospital_id)
+    return df_hospitals
 
 # --------------------------------------
 # 2. Doctor Data Generation
 # --------------------------------------
-def generate_doctors(n):
+@traced
+def generate_doctors(n, df_hospitals):
     """Generate doctor records with random experience and associated hospital."""
+    hospital_ids = df_hospitals['hospital_id'].values
     data = []
     for i in tqdm(range(n), desc="Generating doctor data"):
         data.append({
             'doctor_id': f'DOCT{i:05d}',
             'doctor_name': fake.name(),
             'experience': np.random.randint(1, 40),
-            'hospital_id': np.random.choice(df_hospitals['hospital_id'].values)
+            'hospital_id': np.random.choice(hospital_ids)
         })
     return pd.DataFrame(data)
 
-df_doctors = generate_doctors(65000)
-df_doctors.to_csv(f"{DATA_PROCESSED}/doctors.csv", index=False)
-
 # --------------------------------------
 # 3. Patient Data Generation
 # --------------------------------------
-df_diseases = pd.read_csv(f"{DATA_PROCESSED}/diseases.csv")
-city_state_list = df_hospitals[['city', 'state']].dropna().values.tolist()
-
-def generate_patients(n):
+@traced
+def generate_patients(n, df_diseases, df_hospitals):
     """Generate fake patients with diseases, location, and registration date."""
+    city_state_list = df_hospitals[['city', 'state']].dropna().values.tolist()
     data = []
     for i in tqdm(range(n), desc="Generating patients"):
         city, state = random.choice(city_state_list)
@@ -71,20 +83,17 @@ def generate_patients(n):
         })
     return pd.DataFrame(data)
 
-df_patients = generate_patients(100000)
-df_patients.to_csv(f"{DATA_PROCESSED}/patients.csv", index=False)
-
 # --------------------------------------
 # 4. Appointment Data
 # --------------------------------------
-# Cache columns for speed
-patient_ids = df_patients['patient_id'].values
-registration_dates = df_patients['registration_date'].values
-doctor_ids = df_doctors['doctor_id'].values
-hospital_ids = df_doctors['hospital_id'].values
-
-def generate_appointments(n):
+@traced
+def generate_appointments(n, df_patients, df_doctors):
     """Link patients with doctors and hospitals via appointments."""
+    # Cache columns for speed
+    patient_ids = df_patients['patient_id'].values
+    registration_dates = df_patients['registration_date'].values
+    doctor_ids = df_doctors['doctor_id'].values
+    hospital_ids = df_doctors['hospital_id'].values
     data = []
     for i in tqdm(range(n), desc="Generating appointments"):
         idx_p = np.random.randint(0, len(patient_ids))
@@ -99,14 +108,13 @@ def generate_appointments(n):
         })
     return pd.DataFrame(data)
 
-df_appointments = generate_appointments(300000)
-df_appointments.to_csv(f"{DATA_PROCESSED}/appointments.csv", index=False)
-
 # --------------------------------------
 # 5. Diagnosis Data
 # --------------------------------------
-def generate_diagnosis(n):
+@traced
+def generate_diagnosis(n, df_patients):
     """Generate diagnosis for patients with disease and risk level."""
+    patient_ids = df_patients['patient_id'].values
     disease_map = dict(zip(df_patients['patient_id'], df_patients['disease']))
     reg_dates = pd.to_datetime(df_patients['registration_date']).values
     data = []
@@ -124,14 +132,14 @@ def generate_diagnosis(n):
         })
     return pd.DataFrame(data)
 
-df_diagnosis = generate_diagnosis(50000)
-df_diagnosis.to_csv(f"{DATA_PROCESSED}/diagnosis.csv", index=False)
-
 # --------------------------------------
 # 6. Emergency Cases
 # --------------------------------------
-def generate_emergency_cases(n):
+@traced
+def generate_emergency_cases(n, df_patients):
     """Generate emergency records for patients."""
+    patient_ids = df_patients['patient_id'].values
+    registration_dates = df_patients['registration_date'].values
     data = []
     for i in tqdm(range(n), desc="Generating Emergency cases"):
         idx_p = np.random.randint(0, len(patient_ids))
@@ -144,9 +152,6 @@ def generate_emergency_cases(n):
         })
     return pd.DataFrame(data)
 
-df_emergency_cases = generate_emergency_cases(25000)
-df_emergency_cases.to_csv(f"{DATA_PROCESSED}/emergency_cases.csv", index=False)
-
 # --------------------------------------
 # 7. Insurance Data
 # --------------------------------------
@@ -160,6 +165,7 @@ insurance_company = [
     "Niva Bupa Health Insurance", "Kotak Mahindra General Insurance", "Edelweiss General Insurance"
 ]
 
+@traced
 def generate_insurances(n):
     """Generate insurance company data."""
     data = []
@@ -173,12 +179,10 @@ def generate_insurances(n):
         })
     return pd.DataFrame(data)
 
-df_insurances = generate_insurances(50000)
-df_insurances.to_csv(f"{DATA_PROCESSED}/insurances.csv", index=False)
-
 # --------------------------------------
 # 8. Assign Insurance to Patients
 # --------------------------------------
+@traced
 def assign_insurance_to_some(df_patients, df_insurances, coverage=0.7):
     """Assign insurance to a portion of patients."""
     n_patients = len(df_patients)
@@ -192,22 +196,66 @@ def assign_insurance_to_some(df_patients, df_insurances, coverage=0.7):
     df_patients['is_insured'] = df_patients['insurance_id'].notnull()
     return df_patients
 
-df_patients = assign_insurance_to_some(df_patients, df_insurances)
-df_patients.to_csv(f"{DATA_PROCESSED}/patients.csv", index=False)
-
 # --------------------------------------
 # 9. Generate Churn Labels
 # --------------------------------------
-df_last_visit = df_appointments.groupby('patient_id')['appointment_date'].max().reset_index()
-df_last_visit.rename(columns={'appointment_date': 'last_visit_date'}, inplace=True)
+@traced
+def generate_churn_labels(df_appointments):
+    """Label patients as churned when their last visit is more than 90 days ago."""
+    df_last_visit = df_appointments.groupby('patient_id')['appointment_date'].max().reset_index()
+    df_last_visit.rename(columns={'appointment_date': 'last_visit_date'}, inplace=True)
 
-today = pd.to_datetime('today')
-df_last_visit['last_visit_date'] = pd.to_datetime(df_last_visit['last_visit_date'])
-df_last_visit['days_since_last_visit'] = (today - df_last_visit['last_visit_date']).dt.days
-df_last_visit['churn'] = df_last_visit['days_since_last_visit'].apply(lambda x: 1 if x > 90 else 0)
+    today = pd.to_datetime('today')
+    df_last_visit['last_visit_date'] = pd.to_datetime(df_last_visit['last_visit_date'])
+    df_last_visit['days_since_last_visit'] = (today - df_last_visit['last_visit_date']).dt.days
+    df_last_visit['churn'] = df_last_visit['days_since_last_visit'].apply(lambda x: 1 if x > 90 else 0)
 
-df_churn_label = df_last_visit[['patient_id', 'last_visit_date', 'days_since_last_visit','churn']]
-df_churn_label.to_csv(f"{DATA_PROCESSED}/churn_label.csv", index=False)
+    return df_last_visit[['patient_id', 'last_visit_date', 'days_since_last_visit','churn']]
 
 # --------------------------------------
-print("✅ All files generated successfully!")
+# Generate and save all tables
+# --------------------------------------
+@traced
+def generate_all_data(data_raw=DATA_RAW, data_processed=DATA_PROCESSED, scale=1.0, diseases_path=None):
+    """
+    Generates every table and writes it as CSV into data_processed.
+
+    Row counts are ROW_COUNTS multiplied by scale (at least one row each).
+    diseases.csv is an input; it is read from data_processed unless
+    diseases_path is given.
+    """
+    counts = {table: max(1, int(n * scale)) for table, n in ROW_COUNTS.items()}
+    diseases_path = diseases_path or f"{data_processed}/diseases.csv"
+
+    df_hospitals = generate_hospitals(pd.read_csv(f"{data_raw}/HospitalsInIndia.csv"))
+    df_hospitals.to_csv(f"{data_processed}/hospitals.csv", index=False)
+
+    df_doctors = generate_doctors(counts['doctors'], df_hospitals)
+    df_doctors.to_csv(f"{data_processed}/doctors.csv", index=False)
+
+    df_diseases = pd.read_csv(diseases_path)
+    df_patients = generate_patients(counts['patients'], df_diseases, df_hospitals)
+
+    df_appointments = generate_appointments(counts['appointments'], df_patients, df_doctors)
+    df_appointments.to_csv(f"{data_processed}/appointments.csv", index=False)
+
+    df_diagnosis = generate_diagnosis(counts['diagnosis'], df_patients)
+    df_diagnosis.to_csv(f"{data_processed}/diagnosis.csv", index=False)
+
+    df_emergency_cases = generate_emergency_cases(counts['emergency_cases'], df_patients)
+    df_emergency_cases.to_csv(f"{data_processed}/emergency_cases.csv", index=False)
+
+    df_insurances = generate_insurances(counts['insurances'])
+    df_insurances.to_csv(f"{data_processed}/insurances.csv", index=False)
+
+    df_patients = assign_insurance_to_some(df_patients, df_insurances)
+    df_patients.to_csv(f"{data_processed}/patients.csv", index=False)
+
+    df_churn_label = generate_churn_labels(df_appointments)
+    df_churn_label.to_csv(f"{data_processed}/churn_label.csv", index=False)
+
+    print("✅ All files generated successfully!")
+
+
+if __name__ == "__main__":
+    generate_all_data()
@@ -0,0 +1,333 @@
+"""
+charts.py - Figure drawing and batch rendering for healthcare analytics charts.
+
+Every draw_* function receives the small aggregated data produced by the
+EDA layer and returns a matplotlib Figure. They never load data and never
+call plt.show(), so they can run headless inside worker processes.
+"""
+
+import hashlib
+import inspect
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import matplotlib
+import matplotlib.pyplot as plt
+import pandas as pd
+import seaborn as sns
+from matplotlib.patches import Patch
+
+from src.instrumentation import count_rows, record_span, traced
+
+# Manifest stored next to the images mapping each output file to its fingerprint
+MANIFEST_NAME = "render_manifest.json"
+
+
+def draw_common_disease(df_top_disease):
+    """Draw top diseases across India."""
+    fig = plt.figure(figsize=(10, 6))
+    plt.barh(df_top_disease['disease'], df_top_disease['count'], color='skyblue')
+    plt.xlabel('Count')
+    plt.ylabel('Top Diseases')
+    plt.title("Top diseases across India")
+    plt.gca().invert_yaxis()
+    plt.tight_layout()
+    return fig
+
+
+def draw_common_age_group_by_critical_illness(df_common_age_group):
+    """Draw age groups most affected by critical illness."""
+    fig = plt.figure(figsize=(10, 6))
+    plt.barh(df_common_age_group['age_group'], df_common_age_group['count'], color='orange')
+    plt.xlabel('Count')
+    plt.ylabel('Age Group')
+    plt.title("Top Age Group By Critical Illness")
+    plt.gca().invert_yaxis()
+    plt.tight_layout()
+    return fig
+
+
+def draw_disease_frequency_by_gender(pivoted):
+    """Draw disease frequency distribution by gender."""
+    ax = pivoted.plot(kind='bar', figsize=(12, 6))
+    plt.xlabel('Disease')
+    plt.ylabel('Count')
+    plt.title("Disease Frequency By Gender")
+    plt.tight_layout()
+    return ax.figure
+
+
+def draw_patients_by_state(patients_by_state):
+    """Draw patient distribution across top states."""
+    fig = plt.figure(figsize=(10, 6))
+    patients_by_state.plot(kind='bar')
+    plt.xlabel("State")
+    plt.ylabel("Patient Count")
+    plt.title("Patients Distribution by State")
+    plt.tight_layout()
+    return fig
+
+
+def draw_registration_trends_over_time(registration_trends):
+    """Draw registration trend of patients over time."""
+    ax = registration_trends.plot(kind='line', marker='o', color='darkorange', figsize=(12, 6))
+    plt.xlabel("Registration Month")
+    plt.ylabel("Patients Count")
+    plt.title("Registration Trends Over Time")
+    plt.tight_layout()
+    return ax.figure
+
+
+def draw_emergency_cases_type(emergency_cases_by_type):
+    """Draw emergency cases by severity type."""
+    fig = plt.figure()
+    plt.pie(emergency_cases_by_type, labels=emergency_cases_by_type.index, autopct='%1.1f%%', startangle=140)
+    plt.title("Emergency Cases By Severity Type")
+    plt.tight_layout()
+    return fig
+
+
+def draw_risk_level_vs_age(summary, width=0.8):
+    """
+    Draw age distribution across risk levels from precomputed summaries.
+
+    Takes the (stats, density) pair from get_risk_level_age_distribution and
+    draws seaborn-style dodged violins with an inner box, without touching the
+    underlying rows.
+    """
+    stats, density = summary
+    if stats.empty:
+        fig, ax = plt.subplots(figsize=(10, 6))
+        ax.text(0.5, 0.5, "No diagnoses to show", ha='center', va='center', transform=ax.transAxes)
+        plt.title("Risk Level vs. Age")
+        plt.xlabel("Risk Level")
+        plt.ylabel("Age")
+        plt.tight_layout()
+        return fig
+
+    grid = density.columns.to_numpy(dtype=float)
+    risk_levels = stats.index.get_level_values('risk_level').unique()
+    genders = stats.index.get_level_values('gender').unique()
+    colors = dict(zip(genders, sns.color_palette('Set2', len(genders), desat=0.75)))
+
+    # Same scaling as seaborn's density_norm='area': the widest violin fills its slot
+    slot = width / len(genders)
+    scale = (slot / 2) / density.to_numpy().max()
+
+    fig, ax = plt.subplots(figsize=(10, 6))
+    for x, risk_level in enumerate(risk_levels):
+        for h, gender in enumerate(genders):
+            if (risk_level, gender) not in stats.index:
+                continue
+            row = stats.loc[(risk_level, gender)]
+            center = x - width / 2 + slot * (h + 0.5)
+            half_width = density.loc[(risk_level, gender)].to_numpy() * scale
+            support = half_width > 0
+            ax.fill_betweenx(grid[support], center - half_width[support], center + half_width[support],
+                             facecolor=colors[gender], edgecolor='dimgray', linewidth=1)
+            # Inner box: whiskers, interquartile range and median
+            ax.vlines(center, row['whisker_low'], row['whisker_high'], color='dimgray', linewidth=1.5)
+            ax.vlines(center, row['q1'], row['q3'], color='dimgray', linewidth=5)
+            ax.scatter(center, row['median'], color='white', s=15, zorder=3)
+
+    ax.set_xticks(range(len(risk_levels)))
+    ax.set_xticklabels(risk_levels)
+    ax.legend(handles=[Patch(facecolor=colors[g], edgecolor='dimgray', label=g) for g in genders], title='gender')
+    plt.title("Risk Level vs. Age")
+    plt.xlabel("Risk Level")
+    plt.ylabel("Age")
+    plt.tight_layout()
+    return fig
+
+
+def draw_diagnosis_count_per_doctor(diagnosis_per_doctor):
+    """Draw diagnosis count for each doctor."""
+    ax = diagnosis_per_doctor.plot(kind='bar', figsize=(10, 6))
+    plt.xlabel("Doctor Name")
+    plt.ylabel("Diagnosis Count")
+    plt.title("Diagnosis Count Per Doctor")
+    plt.tight_layout()
+    return ax.figure
+
+
+def draw_hospital_capacity_vs_appointments(capacity_vs_appointments):
+    """Scatter plot of hospital capacity vs. appointment count."""
+    fig = plt.figure(figsize=(10, 6))
+    # Scatter plot helps visualize the correlation between capacity and appointment load
+    plt.scatter(data=capacity_vs_appointments, x='capacity', y='count', alpha=0.7, color='teal')
+    plt.title("Hospital Capacity Vs Appointments")
+    plt.xlabel("Hospital Capacity")
+    plt.ylabel("Appointment Count")
+    plt.tight_layout()
+    return fig
+
+
+def draw_appointments_needing_follow_up_by_disease(follow_up_counts):
+    """Draw diseases needing follow-up appointments."""
+    fig = plt.figure(figsize=(10, 6))
+    plt.barh(follow_up_counts['disease'], follow_up_counts['follow_up_counts'], color='orange')
+    plt.xlabel("Disease")
+    plt.ylabel("Follow Up Count")
+    plt.title("Appointment Needing Follow Up by Disease")
+    plt.gca().invert_yaxis()
+    plt.tight_layout()
+    return fig
+
+
+def save_figure(fig, file_name, output_dir, fmt="png", dpi=300):
+    """Save a figure as <output_dir>/<file_name>.<fmt> and return the path."""
+    path = os.path.join(output_dir, f"{file_name}.{fmt}")
+    fig.savefig(path, bbox_inches="tight", dpi=dpi, format=fmt)
+    return path
+
+
+def _init_worker():
+    # Workers never display anything, so always use the non-interactive backend
+    matplotlib.use("Agg")
+
+
+def _render_chart(draw, data, file_name, output_dir, fmt, dpi):
+    """
+    Worker entry point: draw one chart, save it and free the figure.
+
+    Returns the path and the timing of the render, which the parent records
+    as a trace span (workers never write trace files themselves).
+    """
+    started, start, cpu_start = time.time(), time.perf_counter(), time.process_time()
+    fig = draw(data)
+    path = save_figure(fig, file_name, output_dir, fmt=fmt, dpi=dpi)
+    plt.close(fig)
+    timing = {'start': started, 'wall': time.perf_counter() - start, 'cpu': time.process_time() - cpu_start,
+              'pid': os.getpid()}
+    return path, timing
+
+
+def source_digest(draw):
+    """Returns the sha256 of the source file defining a draw function (covers its styling and helpers)."""
+    with open(inspect.getsourcefile(draw), "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+
+def chart_fingerprint(draw, data, params=None, fmt="png", dpi=300):
+    """
+    Returns a fingerprint of a chart's drawing code, aggregated input data and plot parameters.
+
+    The chart only needs re-rendering when this value changes.
+    """
+    digest = hashlib.sha256()
+    digest.update(f"{draw.__module__}.{draw.__qualname__}|{fmt}|{dpi}".encode())
+    digest.update(source_digest(draw).encode())
+    digest.update(json.dumps(params or {}, sort_keys=True, default=str).encode())
+
+    # Hash values, index, column names and dtypes of every frame in the data
+    frames = data if isinstance(data, (tuple, list)) else [data]
+    for frame in frames:
+        if isinstance(frame, pd.DataFrame):
+            digest.update(repr([(str(c), str(t)) for c, t in frame.dtypes.items()]).encode())
+        else:
+            digest.update(repr((frame.name, str(frame.dtype))).encode())
+        digest.update(pd.util.hash_pandas_object(frame, index=True).values.tobytes())
+    return digest.hexdigest()
+
+
+def load_manifest(output_dir):
+    """Loads the render manifest of an output directory (empty if missing or unreadable)."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_manifest(output_dir, manifest):
+    """Writes the render manifest atomically next to the images."""
+    path = os.path.join(output_dir, MANIFEST_NAME)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def is_up_to_date(manifest, output_dir, file_name, fingerprint):
+    """A chart is up to date when the manifest holds its fingerprint and the image still exists."""
+    return manifest.get(file_name) == fingerprint and os.path.exists(os.path.join(output_dir, file_name))
+
+
+def save_chart(fig, draw, data, file_name, output_dir, params=None, fmt="png", dpi=300, force=False):
+    """
+    Saves an already drawn figure unless the manifest shows the image is up to date.
+
+    Used by the interactive plot_* functions, which still draw every figure to
+    show it but skip the costly savefig for unchanged charts.
+
+    Returns:
+        - str: path of the image.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    image_name = f"{file_name}.{fmt}"
+    fingerprint = chart_fingerprint(draw, data, params, fmt=fmt, dpi=dpi)
+    if not force and is_up_to_date(manifest, output_dir, image_name, fingerprint):
+        print(f"⏭️ Skipped: '{image_name}' is up to date.")
+        return os.path.join(output_dir, image_name)
+    path = save_figure(fig, file_name, output_dir, fmt=fmt, dpi=dpi)
+    manifest[image_name] = fingerprint
+    save_manifest(output_dir, manifest)
+    return path
+
+
+@traced
+def render_charts(jobs, output_dir, fmt="png", dpi=300, max_workers=None, force=False):
+    """
+    Renders chart jobs headless in a process pool.
+
+    Each job is a dict with 'name' (output file name without extension),
+    'draw' (a top-level draw_* function), 'data' (its aggregated input) and
+    optionally 'params' (plot parameters such as top_n). Only the aggregated
+    data is sent to the workers. Charts whose fingerprint matches the
+    manifest and whose file exists are skipped unless force is True.
+
+    Returns:
+        - dict: chart name and render time in seconds (0 for skipped charts).
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    manifest = load_manifest(output_dir)
+    timings = {}
+    start = time.perf_counter()
+
+    # Work out which charts are stale before starting any worker
+    pending = []
+    for job in jobs:
+        file_name = f"{job['name']}.{fmt}"
+        fingerprint = chart_fingerprint(job['draw'], job['data'], job.get('params'), fmt=fmt, dpi=dpi)
+        if not force and is_up_to_date(manifest, output_dir, file_name, fingerprint):
+            timings[job['name']] = 0.0
+            print(f"⏭️ Skipped: '{file_name}' is up to date.")
+            continue
+        pending.append((job, file_name, fingerprint))
+
+    if pending:
+        # Spawned workers do not inherit locks held by other threads (e.g. a concurrent SQL import)
+        with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_worker,
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            futures = [
+                (job, file_name, fingerprint,
+                 pool.submit(_render_chart, job['draw'], job['data'], job['name'], output_dir, fmt, dpi))
+                for job, file_name, fingerprint in pending
+            ]
+            for job, file_name, fingerprint, future in futures:
+                path, timing = future.result()
+                elapsed = timings[job['name']] = timing['wall']
+                record_span(f"render.{job['name']}", timing['start'], elapsed, cpu=timing['cpu'],
+                            rows_in=count_rows(job['data']), pid=timing['pid'], tid=timing['pid'])
+                manifest[file_name] = fingerprint
+                print(f"✅ Rendered: '{path}' in {elapsed:.2f}s")
+        save_manifest(output_dir, manifest)
+
+    total = time.perf_counter() - start
+    print(f"🎉 Rendered {len(pending)} of {len(jobs)} charts in {total:.2f}s")
+    return timings
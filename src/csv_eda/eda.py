@@ -1,11 +1,21 @@
-from src.csv_eda.load_csv import load_all_data
+import numpy as np
 import pandas as pd
+from src.instrumentation import traced
 
-# Unpack all DataFrames returned from load_all_data():  — must be in correct order to avoid mismatches
-df_appointments, df_churn_label, df_diagnosis, df_diseases, df_doctors, df_emergency_cases, df_hospitals, df_insurances, df_patients = load_all_data()
+# Display order of risk levels in charts (unknown levels follow alphabetically)
+RISK_LEVELS = ['Low', 'Medium', 'High']
+
+# Age bins and labels of the age groups
+AGE_BINS = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
+AGE_GROUPS = ['0-10', '11-20', '21-30', '31-40', '41-50', '51-60', '61-70', '71-80', '81-90', '91-100']
+
+# Columns of the per-group summary returned by get_risk_level_age_distribution
+STAT_COLUMNS = ['count', 'mean', 'std', 'bandwidth', 'min', 'whisker_low', 'q1', 'median', 'q3', 'whisker_high',
+                'max']
 
 
 # 1. Most common diseases across India
+@traced
 def get_common_disease(df_patients, top_n):
     """Returns most common diseases.
 
@@ -19,6 +29,7 @@ def get_common_disease(df_patients, top_n):
 
 
 # 2. Age group most affected by critical illnesses
+@traced
 def get_age_group_affected_by_critical_illness(df_diagnosis, df_patients, top_n):
     """Returns most affected age groups by high-risk illness.
 
@@ -28,12 +39,8 @@ def get_age_group_affected_by_critical_illness(df_diagnosis, df_patients, top_n)
     # Merge patient and diagnosis data on patient_id
     merged_df = pd.merge(df_diagnosis, df_patients, on='patient_id')
 
-    # Define age bins and labels
-    bins = [0, 10, 20, 30, 40, 50, 60, 70, 80, 90, 100]
-    labels = ['0-10', '11-20', '21-30', '31-40', '41-50', '51-60', '61-70', '71-80', '81-90', '91-100']
-
     # Create age group column
-    merged_df['age_group'] = pd.cut(merged_df['age'], bins=bins, labels=labels, right=False)
+    merged_df['age_group'] = pd.cut(merged_df['age'], bins=AGE_BINS, labels=AGE_GROUPS, right=False)
 
     # Filter only high-risk cases
     high_risk_df = merged_df[merged_df['risk_level'] == 'High']
@@ -46,6 +53,7 @@ def get_age_group_affected_by_critical_illness(df_diagnosis, df_patients, top_n)
 
 
 # 3. Disease frequency by gender
+@traced
 def get_disease_frequency_by_gender(df_patients, top_n):
     """Returns disease frequency by gender.
 
@@ -67,6 +75,7 @@ def get_disease_frequency_by_gender(df_patients, top_n):
 
 
 # 4. Patient distribution by state
+@traced
 def get_patient_distribution_by_state(df_patients, top_n):
     """Returns patient count by state.
 
@@ -79,17 +88,18 @@ def get_patient_distribution_by_state(df_patients, top_n):
 
 
 # 5. Patient registration trends over time
+@traced
 def get_patients_registration_trends_over_time(df_patients):
     """Returns patient registration trend over months.
 
     Returns:
         - Series: month and registration count.
     """
-    # Convert registration_date to datetime
-    df_patients['registration_date'] = pd.to_datetime(df_patients['registration_date'])
+    # Convert registration_date to datetime (locally, so the shared frame is left untouched)
+    registration_date = pd.to_datetime(df_patients['registration_date'])
 
     # Group by month and count registrations
-    registration_trends = df_patients.groupby(df_patients['registration_date'].dt.to_period('M')).size()
+    registration_trends = df_patients.groupby(registration_date.dt.to_period('M')).size()
 
     # Convert index back to timestamp for plotting
     registration_trends.index = registration_trends.index.to_timestamp()
@@ -97,6 +107,7 @@ def get_patients_registration_trends_over_time(df_patients):
 
 
 # 6. Emergency cases by type
+@traced
 def get_emergency_cases_type(df_emergency_cases):
     """Returns emergency cases by severity type.
 
@@ -109,6 +120,7 @@ def get_emergency_cases_type(df_emergency_cases):
 
 
 # 7. Risk level vs. age scatter plot
+@traced
 def get_risk_level_vs_age(df_patients, df_diagnosis):
     """Returns age vs risk level data.
 
@@ -121,6 +133,7 @@ def get_risk_level_vs_age(df_patients, df_diagnosis):
 
 
 # 8. Diagnosis count per doctor
+@traced
 def get_diagnosis_count_per_docter(df_doctors, df_appointments, df_diagnosis, top_n):
     """Returns diagnosis count per doctor.
 
@@ -140,6 +153,7 @@ def get_diagnosis_count_per_docter(df_doctors, df_appointments, df_diagnosis, to
 
 
 # 9. Hospital capacity vs. no. of appointments
+@traced
 def get_hospital_capacity_vs_appointments(df_hospitals, df_appointments):
     """Returns appointment count vs hospital capacity.
 
@@ -159,6 +173,7 @@ def get_hospital_capacity_vs_appointments(df_hospitals, df_appointments):
 
 
 # 10. Appointments needing follow-up by disease
+@traced
 def get_appointments_needing_follow_up_by_disease(df_appointments, df_patients, top_n):
     """Returns top diseases needing follow-up.
 
@@ -174,3 +189,99 @@ def get_appointments_needing_follow_up_by_disease(df_appointments, df_patients,
     # Count follow-ups by disease
     follow_up_counts = df_follow_up['disease'].value_counts().reset_index(name='follow_up_counts').head(top_n)
     return follow_up_counts
+
+
+# 11. Binned age distribution by risk level and gender (plot cost independent of row count)
+@traced
+def get_risk_level_age_distribution(df_patients, df_diagnosis, bin_width=1, grid_size=200, cut=2):
+    """Returns age distribution summaries per risk level and gender.
+
+    Ages are binned in one vectorized pass over the diagnoses; quantiles and a
+    Gaussian KDE (Scott's rule, as used by seaborn) are then derived from the
+    histograms, so the cost of plotting no longer depends on the row count.
+
+    Returns:
+        - DataFrame: count, mean, std, bandwidth, min, whisker_low, q1, median, q3, whisker_high, max
+          indexed by (risk_level, gender).
+        - DataFrame: KDE density indexed by (risk_level, gender) with the shared age grid as columns.
+    """
+    # Look up age and gender per diagnosis instead of materializing the full merge
+    patients = df_patients.drop_duplicates('patient_id').set_index('patient_id')
+    ages = df_diagnosis['patient_id'].map(patients['age'])
+    genders = df_diagnosis['patient_id'].map(patients['gender'])
+    valid = ages.notna() & genders.notna() & df_diagnosis['risk_level'].notna()
+    ages = ages[valid].to_numpy(dtype=float)
+    risks = df_diagnosis['risk_level'][valid]
+    genders = genders[valid]
+
+    if len(ages) == 0:
+        # Nothing to summarize (e.g. an empty table or a small preview sample)
+        index = pd.MultiIndex.from_arrays([[], []], names=['risk_level', 'gender'])
+        return pd.DataFrame(columns=STAT_COLUMNS, index=index, dtype=float), pd.DataFrame(index=index, dtype=float)
+
+    # Fixed category order keeps the chart deterministic regardless of row order
+    risk_levels = [r for r in RISK_LEVELS if r in set(risks)] + sorted(set(risks) - set(RISK_LEVELS))
+    gender_values = sorted(genders.unique())
+
+    # Encode (risk_level, gender, age bin) as one integer per row and count with a single bincount
+    risk_codes = pd.Categorical(risks, categories=risk_levels).codes.astype(np.int64)
+    gender_codes = pd.Categorical(genders, categories=gender_values).codes.astype(np.int64)
+    age_min = np.floor(ages.min() / bin_width) * bin_width
+    bin_codes = ((ages - age_min) // bin_width).astype(np.int64)
+    n_bins = int(bin_codes.max()) + 1
+    n_groups = len(risk_levels) * len(gender_values)
+    flat_codes = (risk_codes * len(gender_values) + gender_codes) * n_bins + bin_codes
+
+    hist = np.bincount(flat_codes, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+    hist_sum = np.bincount(flat_codes, weights=ages, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+    hist_sq = np.bincount(flat_codes, weights=ages ** 2, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+
+    # Representative value of each bin is the mean age inside it (exact for integer ages)
+    bin_edges = age_min + np.arange(n_bins) * bin_width
+    with np.errstate(invalid='ignore', divide='ignore'):
+        bin_values = np.where(hist > 0, hist_sum / hist, bin_edges)
+
+    index = pd.MultiIndex.from_product([risk_levels, gender_values], names=['risk_level', 'gender'])
+    rows = []
+    for g in range(n_groups):
+        counts, values = hist[g], bin_values[g]
+        n = counts.sum()
+        if n == 0:
+            rows.append({'count': 0})
+            continue
+        mean = hist_sum[g].sum() / n
+        std = np.sqrt(max(hist_sq[g].sum() - n * mean ** 2, 0) / max(n - 1, 1))
+        cum = np.cumsum(counts)
+
+        def quantile(q):
+            # Linear interpolation between order statistics, matching np.percentile
+            pos = q * (n - 1)
+            lo = values[np.searchsorted(cum, np.floor(pos), side='right')]
+            hi = values[np.searchsorted(cum, np.ceil(pos), side='right')]
+            return lo + (hi - lo) * (pos - np.floor(pos))
+
+        occupied = values[counts > 0]
+        q1, median, q3 = quantile(0.25), quantile(0.5), quantile(0.75)
+        iqr = q3 - q1
+        rows.append({
+            'count': n, 'mean': mean, 'std': std, 'bandwidth': std * n ** (-1 / 5),
+            'min': occupied.min(), 'whisker_low': occupied[occupied >= q1 - 1.5 * iqr].min(),
+            'q1': q1, 'median': median, 'q3': q3,
+            'whisker_high': occupied[occupied <= q3 + 1.5 * iqr].max(), 'max': occupied.max(),
+        })
+    stats = pd.DataFrame(rows, index=index, columns=STAT_COLUMNS)
+    stats = stats[stats['count'] > 0]
+
+    # Evaluate every KDE on one fixed grid, cut at `cut` bandwidths beyond each group's data range
+    pad = cut * stats['bandwidth'].max()
+    grid = np.linspace(stats['min'].min() - pad, stats['max'].max() + pad, grid_size)
+    densities = []
+    for key, row in stats.iterrows():
+        g = index.get_loc(key)
+        bw = row['bandwidth'] if row['bandwidth'] > 0 else bin_width
+        kernel = np.exp(-0.5 * ((grid[None, :] - bin_values[g][:, None]) / bw) ** 2) / (bw * np.sqrt(2 * np.pi))
+        density = hist[g] @ kernel / row['count']
+        density[(grid < row['min'] - cut * bw) | (grid > row['max'] + cut * bw)] = 0
+        densities.append(density)
+    density = pd.DataFrame(densities, index=stats.index, columns=grid)
+    return stats, density
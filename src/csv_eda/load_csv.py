@@ -1,17 +1,19 @@
 import glob
 import os
 import pandas as pd
+from src.instrumentation import traced
 
 # Path to all processed CSV files
 data_path = r"D:\Data Analytics Project\helthcare_analytics_project\data\processed\*.csv"
 
-def load_all_csv():
+@traced
+def load_all_csv(path=data_path):
     """
     Loads all CSV files from the specified data path into a dictionary.
     Keys are the file names (without .csv extension), values are DataFrames.
     """
     dataframes = {}  # Empty dictionary to store DataFrames with keys as file names
-    csv_files = glob.glob(data_path)  # List of all CSV file paths
+    csv_files = glob.glob(path)  # List of all CSV file paths
 
     for file in csv_files:
         df = pd.read_csv(file)  # Read each CSV into a DataFrame
@@ -21,12 +23,13 @@ def load_all_csv():
     return dataframes  # Return dictionary of DataFrames
 
 
-def load_all_data():
+@traced
+def load_all_data(path=data_path):
     """
     Loads all expected DataFrames using file names as keys from the dictionary.
     Returns a tuple of DataFrames in a fixed order for unpacking in other scripts.
     """
-    dfs = load_all_csv()  # Load all CSVs into a dictionary
+    dfs = load_all_csv(path)  # Load all CSVs into a dictionary
 
     # Return the required DataFrames in specific order using .get(key)
     return (
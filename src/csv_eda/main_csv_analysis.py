@@ -1,8 +1,9 @@
 """Main script to run visualizations on CSV-based healthcare data."""
 
-# Load all datasets and unpack them in a proper sorted order to avoid mismatches
+import argparse
+
+from src.instrumentation import traced
 from src.csv_eda.load_csv import load_all_data
-df_appointments, df_churn_label, df_diagnosis, df_diseases, df_doctors, df_emergency_cases, df_hospitals, df_insurances, df_patients = load_all_data()
 
 # Import all visualization functions
 from src.csv_eda.visualization import (
@@ -15,38 +16,66 @@ from src.csv_eda.visualization import (
     plot_risk_level_vs_age,
     plot_diagnosis_count_per_doctor,
     plot_hospital_capacity_vs_appointments,
-    plot_appointments_needing_follow_up_by_disease
+    plot_appointments_needing_follow_up_by_disease,
+    render_all_charts
 )
 
-# NOTE: All output image files will be saved automatically to the path defined in visualization.py:
-#       D:\Data Analytics Project\helthcare_analytics_project\outputs\visuals\csv
 
-# Plot top common diseases across India
-plot_common_disease(df_patients, top_n=10)
+@traced
+def main():
+    # Command line options for the headless batch rendering mode
+    parser = argparse.ArgumentParser(description="Render healthcare analytics charts from CSV data.")
+    parser.add_argument("--batch", action="store_true", help="Render all charts headless in parallel (no plt.show()).")
+    parser.add_argument("--format", default="png", help="Output image format for batch mode, e.g. png, svg, pdf.")
+    parser.add_argument("--dpi", type=int, default=300, help="Output resolution for batch mode.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of render processes for batch mode.")
+    parser.add_argument("--force", action="store_true",
+                        help="Save every chart even if its inputs are unchanged (both modes use the render manifest).")
+    args = parser.parse_args()
+
+    # Load all datasets and unpack them in a proper sorted order to avoid mismatches
+    df_appointments, df_churn_label, df_diagnosis, df_diseases, df_doctors, df_emergency_cases, df_hospitals, df_insurances, df_patients = load_all_data()
+
+    # NOTE: All output image files will be saved automatically to the path defined in visualization.py:
+    #       D:\Data Analytics Project\helthcare_analytics_project\outputs\visuals\csv
+
+    if args.batch:
+        # Render stale charts headless in a process pool and report the total render time
+        render_all_charts(df_appointments, df_diagnosis, df_doctors, df_emergency_cases, df_hospitals, df_patients,
+                          top_n=10, fmt=args.format, dpi=args.dpi, max_workers=args.workers, force=args.force)
+        return
+
+    # Plot top common diseases across India
+    plot_common_disease(df_patients, top_n=10, force=args.force)
+
+    # Plot most affected age groups by critical illness
+    plot_common_age_group_by_critical_illness(df_diagnosis, df_patients, top_n=10, force=args.force)
+
+    # Plot disease frequency segmented by gender
+    plot_disease_frequency_by_gender(df_patients, top_n=10, force=args.force)
 
-# Plot most affected age groups by critical illness
-plot_common_age_group_by_critical_illness(df_diagnosis, df_patients, top_n=10)
+    # Plot patient count distribution by state
+    plot_patients_by_state(df_patients, top_n=10, force=args.force)
 
-# Plot disease frequency segmented by gender
-plot_disease_frequency_by_gender(df_patients, top_n=10)
+    # Plot registration trends of patients over time
+    plot_registration_trends_over_time(df_patients, force=args.force)
 
-# Plot patient count distribution by state
-plot_patients_by_state(df_patients, top_n=10)
+    # Plot emergency case distribution by severity type
+    plot_emergency_cases_type(df_emergency_cases, force=args.force)
 
-# Plot registration trends of patients over time
-plot_registration_trends_over_time(df_patients)
+    # Plot correlation between risk level and age
+    plot_risk_level_vs_age(df_patients, df_diagnosis, force=args.force)
 
-# Plot emergency case distribution by severity type
-plot_emergency_cases_type(df_emergency_cases)
+    # Plot number of diagnoses made by each doctor
+    plot_diagnosis_count_per_doctor(df_doctors, df_appointments, df_diagnosis, top_n=10, force=args.force)
 
-# Plot correlation between risk level and age
-plot_risk_level_vs_age(df_patients, df_diagnosis)
+    # Plot relation between hospital capacity and appointment count
+    plot_hospital_capacity_vs_appointments(df_hospitals, df_appointments, force=args.force)
 
-# Plot number of diagnoses made by each doctor
-plot_diagnosis_count_per_doctor(df_doctors, df_appointments, df_diagnosis, top_n=10)
+    # Plot diseases that most frequently need follow-up appointments
+    plot_appointments_needing_follow_up_by_disease(df_appointments, df_patients, top_n=10, force=args.force)
 
-# Plot relation between hospital capacity and appointment count
-plot_hospital_capacity_vs_appointments(df_hospitals, df_appointments)
 
-# Plot diseases that most frequently need follow-up appointments
-plot_appointments_needing_follow_up_by_disease(df_appointments, df_patients, top_n=10)
+# Guard is required so render worker processes do not re-run the script on import
+if __name__ == "__main__":
+    main()
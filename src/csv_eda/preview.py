@@ -0,0 +1,380 @@
+"""
+preview.py - Stratified-sample preview mode for interactive EDA.
+
+A preview sample keeps a fraction of patients, stratified by state, disease
+and risk level (the highest risk level among each patient's diagnoses),
+together with all of their appointments, diagnoses, emergency cases and
+churn labels, so joins inside the sample stay referentially intact. The
+dimension tables (diseases, doctors, hospitals, insurances) are kept whole.
+
+Stratum sizes use randomized rounding, so every patient is included with
+the same probability and counts scale back up by 1 / fraction, with
+normal-approximation confidence intervals. Patients
+are the sampling unit and their rows (appointments, diagnoses, ...) are
+sampled together, so the variance is computed from per-patient totals
+within each stratum (a stratified cluster estimator), not from row counts.
+
+Top-N metrics pick their keys by sample count and are then re-ranked on the
+estimate. Keys that made the cut partly by sampling luck are biased upward
+(most near the cutoff), so check boundary ranks in exact mode. Row-level
+results are returned unscaled.
+
+Usage in a notebook:
+    session = EDASession(tables, load_preview())
+    session.preview().get_common_disease(top_n=10)   # fast estimate with CIs
+    session.exact().get_common_disease(top_n=10)     # full scan
+
+Build the sample once (from the project root):
+    python -m src.csv_eda.preview build --fraction 0.05
+"""
+
+import argparse
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from clean_and_generate_data import DATA_PROCESSED
+from src.csv_eda import eda
+from src.csv_eda.load_csv import load_all_csv
+from src.instrumentation import traced
+
+PREVIEW_DIR = os.path.join(DATA_PROCESSED, "preview")
+META_FILE = "preview_meta.json"
+STRATA = ['state', 'disease', 'risk_level']
+
+# Tables filtered to the sampled patients; every other table is kept whole
+PATIENT_TABLES = ['patients', 'appointments', 'diagnosis', 'emergency_cases', 'churn_label']
+
+
+
+def _follow_up_rows(t):
+    merged = pd.merge(t['appointments'], t['patients'][['patient_id', 'disease']], on='patient_id', how='left')
+    return merged[merged['follow_up_needed'] == 'Yes'][['patient_id', 'disease']]
+
+
+def _critical_age_group_rows(t):
+    merged = pd.merge(t['diagnosis'][['patient_id', 'risk_level']], t['patients'][['patient_id', 'age']],
+                      on='patient_id')
+    merged = merged[merged['risk_level'] == 'High']
+    return merged.assign(age_group=pd.cut(merged['age'], bins=eda.AGE_BINS, labels=eda.AGE_GROUPS, right=False))
+
+
+def _diagnosis_per_doctor_rows(t):
+    merged = pd.merge(t['appointments'][['patient_id', 'doctor_id']], t['doctors'][['doctor_id', 'doctor_name']],
+                      on='doctor_id')
+    return pd.merge(merged, t['diagnosis'][['patient_id', 'diagnosis_id']], on='patient_id')
+
+
+def _registration_month_rows(t):
+    month = pd.to_datetime(t['patients']['registration_date']).dt.to_period('M').dt.to_timestamp()
+    return pd.DataFrame({'patient_id': t['patients']['patient_id'], 'registration_date': month})
+
+
+def _risk_level_gender_rows(t):
+    merged = pd.merge(t['diagnosis'][['patient_id', 'risk_level']], t['patients'][['patient_id', 'age', 'gender']],
+                      on='patient_id')
+    return merged.dropna(subset=['risk_level', 'age', 'gender'])
+
+
+# How each estimated metric counts rows: 'rows' returns the counted rows (with patient_id) from the
+# tables, 'keys' identify a result row, 'column' is the count column (None = every column of a
+# Series or pivot) and 'ranked' marks top-N results ordered by count. Metrics not listed here, such
+# as the row-level get_risk_level_vs_age, return sample rows unscaled. For tuple results the first
+# frame is estimated.
+ESTIMATES = {
+    'get_common_disease': {'rows': lambda t: t['patients'], 'keys': ['disease'], 'column': 'count',
+                           'ranked': True},
+    'get_age_group_affected_by_critical_illness': {'rows': _critical_age_group_rows, 'keys': ['age_group'],
+                                                   'column': 'count', 'ranked': True},
+    'get_disease_frequency_by_gender': {'rows': lambda t: t['patients'], 'keys': ['disease', 'gender'],
+                                        'column': None, 'ranked': False},
+    'get_patient_distribution_by_state': {'rows': lambda t: t['patients'], 'keys': ['state'], 'column': None,
+                                          'ranked': True},
+    'get_patients_registration_trends_over_time': {'rows': _registration_month_rows, 'keys': ['registration_date'],
+                                                   'column': None, 'ranked': False},
+    'get_emergency_cases_type': {'rows': lambda t: t['emergency_cases'], 'keys': ['severity_type'], 'column': None,
+                                 'ranked': False},
+    'get_diagnosis_count_per_docter': {'rows': _diagnosis_per_doctor_rows, 'keys': ['doctor_name'], 'column': None,
+                                       'ranked': True},
+    'get_hospital_capacity_vs_appointments': {
+        'rows': lambda t: pd.merge(t['hospitals'], t['appointments'], on='hospital_id'),
+        'keys': ['hospital_name', 'capacity'], 'column': 'count', 'ranked': True},
+    'get_appointments_needing_follow_up_by_disease': {'rows': _follow_up_rows, 'keys': ['disease'],
+                                                      'column': 'follow_up_counts', 'ranked': True},
+    # Quantiles and the normalized density are estimated as-is; only the group sizes are scaled
+    'get_risk_level_age_distribution': {'rows': _risk_level_gender_rows, 'keys': ['risk_level', 'gender'],
+                                        'column': 'count', 'ranked': False},
+}
+
+RISK_ORDER = {'Low': 1, 'Medium': 2, 'High': 3}
+
+
+def patient_strata(df_patients, df_diagnosis):
+    """Returns the (state, disease, risk_level) stratum of every patient."""
+    risk = (df_diagnosis.assign(rank=df_diagnosis['risk_level'].map(RISK_ORDER))
+            .groupby('patient_id')['rank'].max())
+    labels = {rank: level for level, rank in RISK_ORDER.items()}
+    risk_level = df_patients['patient_id'].map(risk).map(labels).fillna('None')
+    return pd.DataFrame({'state': df_patients['state'].fillna('Unknown'),
+                         'disease': df_patients['disease'].fillna('Unknown'),
+                         'risk_level': risk_level}, index=df_patients.index)
+
+
+@traced
+def build_preview_sample(tables, fraction=0.05, seed=42):
+    """
+    Draws a stratified patient sample and keeps all rows related to those patients.
+
+    Returns:
+        - dict: table name -> sampled DataFrame, with the metadata (fraction, seed,
+          strata, population and sample sizes) under the 'meta' key.
+    """
+    rng = np.random.default_rng(seed)
+    df_patients = tables['patients']
+    strata = patient_strata(df_patients, tables['diagnosis'])
+
+    # Randomized rounding keeps the inclusion probability at exactly `fraction` in every stratum
+    sizes = strata.groupby(STRATA).size()
+    expected = sizes * fraction
+    take = np.floor(expected) + (rng.random(len(expected)) < expected - np.floor(expected))
+    take = pd.Series(take.astype(int), index=sizes.index)
+
+    # Random rank inside each stratum; keep the first `take` patients of each
+    order = pd.Series(rng.random(len(df_patients)), index=df_patients.index)
+    within = order.groupby([strata[c] for c in STRATA]).rank(method='first')
+    limit = strata.join(take.rename('take'), on=STRATA)['take']
+    sampled_ids = df_patients.loc[within <= limit, 'patient_id']
+
+    sample = {}
+    for name, df in tables.items():
+        if df is None:
+            continue
+        sample[name] = df[df['patient_id'].isin(sampled_ids)] if name in PATIENT_TABLES else df
+
+    # Population and sample size of every stratum, needed to scale estimates back up
+    strata_sizes = pd.DataFrame({'population': sizes, 'sample': take}).reset_index()
+    meta = {
+        'fraction': fraction,
+        'seed': seed,
+        'strata': STRATA,
+        'population': {name: len(df) for name, df in tables.items() if df is not None},
+        'sample': {name: len(df) for name, df in sample.items()},
+        'strata_sizes': strata_sizes[strata_sizes['sample'] > 0].to_dict(orient='records'),
+    }
+    sample['meta'] = meta
+    return sample
+
+
+def save_preview(sample, out_dir=PREVIEW_DIR):
+    """Saves the sampled tables as CSVs plus a metadata file."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, df in sample.items():
+        if name != 'meta':
+            df.to_csv(os.path.join(out_dir, f"{name}.csv"), index=False)
+    with open(os.path.join(out_dir, META_FILE), "w") as f:
+        json.dump(sample['meta'], f, indent=2)
+
+
+def load_preview(preview_dir=PREVIEW_DIR):
+    """Loads a saved preview sample.
+
+    Returns:
+        - dict: table name -> DataFrame, with the metadata under the 'meta' key.
+    """
+    sample = load_all_csv(os.path.join(preview_dir, "*.csv"))
+    with open(os.path.join(preview_dir, META_FILE)) as f:
+        sample['meta'] = json.load(f)
+    return sample
+
+
+def stratified_estimates(rows, keys, patient_strata_ids, strata_sizes, fraction, z=1.96):
+    """
+    Estimates population counts per key from sampled rows with a stratified cluster estimator.
+
+    Rows are first summed per patient (y_i). Every patient had inclusion
+    probability f, so the estimate is sum(y_i) / f. Its variance is summed over
+    strata: a stratum h with n_h >= 2 sampled of N_h patients contributes
+    n_h (1 - n_h / N_h) s_h^2 / f^2, where s_h^2 is the variance of y over its
+    sampled patients (zeros included), plus (ybar_h / f)^2 r_h (1 - r_h) for the
+    randomized rounding of n_h (r_h is the fractional part of f N_h). Strata
+    with a single sampled patient use the Poisson term (1 - f) / f^2 y^2.
+
+    Returns:
+        - DataFrame: estimate, ci_low and ci_high indexed by the key columns.
+    """
+    # Stratum columns are prefixed because keys such as disease or state share their names
+    stratum = [f"stratum_{c}" for c in STRATA]
+    y = rows.groupby(['patient_id'] + keys, observed=True).size().rename('y').reset_index()
+    y = y.join(patient_strata_ids[STRATA].set_axis(stratum, axis=1), on='patient_id')
+    y['y2'] = y['y'] ** 2
+    per_stratum = y.groupby(keys + stratum, observed=True)[['y', 'y2']].sum().reset_index()
+    sizes = strata_sizes.rename(columns=dict(zip(STRATA, stratum))).set_index(stratum)
+    per_stratum = per_stratum.join(sizes[['population', 'sample']], on=stratum)
+
+    f = fraction
+    N, n = per_stratum['population'].astype(float), per_stratum['sample'].astype(float)
+    sum_y, sum_y2 = per_stratum['y'].astype(float), per_stratum['y2'].astype(float)
+    r = f * N - np.floor(f * N)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        s2 = (sum_y2 - sum_y ** 2 / n) / (n - 1)
+        stratified = n * (1 - n / N) * s2 / f ** 2 + (sum_y / n / f) ** 2 * r * (1 - r)
+    per_stratum['estimate'] = sum_y / f
+    per_stratum['variance'] = np.where(n > 1, stratified, (1 - f) / f ** 2 * sum_y2)
+
+    totals = per_stratum.groupby(keys, observed=True)[['estimate', 'variance']].sum()
+    se = np.sqrt(totals['variance'].clip(lower=0))
+    result = pd.DataFrame({'estimate': totals['estimate'].round(),
+                           'ci_low': (totals['estimate'] - z * se).clip(lower=0).round(),
+                           'ci_high': (totals['estimate'] + z * se).round()})
+    result.index = _key_index(result.index.to_frame(index=False))
+    return result
+
+
+def _key_index(key_frame):
+    # Object-typed MultiIndex so categorical, integer and timestamp keys match across frames
+    return pd.MultiIndex.from_frame(key_frame.astype(object))
+
+
+def apply_estimates(result, estimates, keys, column=None, ranked=False):
+    """
+    Replaces the sample counts of a metric result by population estimates with confidence intervals.
+
+    Each estimated column c gets c_ci_low and c_ci_high next to it. A Series
+    becomes a DataFrame with estimate, ci_low and ci_high columns.
+    """
+    if isinstance(result, pd.Series):
+        index = _key_index(result.index.to_frame(index=False).set_axis(keys, axis=1))
+        frame = estimates.reindex(index).fillna(0)
+        frame.index = result.index
+        return frame.sort_values('estimate', ascending=False, kind='stable') if ranked else frame
+
+    result = result.copy()
+    if column is None:
+        # Pivot: the row index holds the first key, the columns the last one
+        columns = list(result.columns)
+        for c in columns:
+            key_frame = result.index.to_frame(index=False).set_axis(keys[:-1], axis=1).assign(**{keys[-1]: c})
+            frame = estimates.reindex(_key_index(key_frame)).fillna(0)
+            position = result.columns.get_loc(c)
+            result[c] = frame['estimate'].to_numpy()
+            result.insert(position + 1, f"{c}_ci_low", frame['ci_low'].to_numpy())
+            result.insert(position + 2, f"{c}_ci_high", frame['ci_high'].to_numpy())
+        return result
+
+    key_frame = result[keys] if set(keys) <= set(result.columns) else result.index.to_frame(index=False)[keys]
+    frame = estimates.reindex(_key_index(key_frame)).fillna(0)
+    position = result.columns.get_loc(column)
+    result[column] = frame['estimate'].to_numpy()
+    result.insert(position + 1, f"{column}_ci_low", frame['ci_low'].to_numpy())
+    result.insert(position + 2, f"{column}_ci_high", frame['ci_high'].to_numpy())
+    if ranked:
+        result = result.sort_values(column, ascending=False, kind='stable').reset_index(drop=True)
+    return result
+
+
+class EDASession:
+    """
+    Runs the eda.py get_* functions by name with the tables bound automatically.
+
+    In exact mode the full tables are used; in preview mode the stratified
+    sample is used and counts come back as scaled estimates with confidence
+    intervals. Switch with .exact() and .preview().
+
+    Metrics take the same arguments as in eda.py without the tables, e.g.
+    session.get_common_disease(10). In exact mode a df_<table> keyword
+    overrides the bound table; in preview mode that is rejected.
+    """
+
+    def __init__(self, tables, preview_sample=None, z=1.96):
+        self.tables = tables
+        self.preview_sample = preview_sample
+        self.z = z
+        self.mode = 'exact'
+        self._strata = None
+
+    def exact(self):
+        self.mode = 'exact'
+        return self
+
+    def preview(self):
+        if self.preview_sample is None:
+            raise ValueError("❌ No preview sample loaded; build one with build_preview_sample() or load_preview().")
+        self.mode = 'preview'
+        return self
+
+    @property
+    def fraction(self):
+        """Realized patient sampling fraction of the preview sample."""
+        meta = self.preview_sample['meta']
+        return meta['sample']['patients'] / meta['population']['patients']
+
+    def estimate(self, name, result):
+        """Replaces the sample counts of a preview result by stratified estimates with confidence intervals."""
+        sample = self.preview_sample
+        if 'strata_sizes' not in sample['meta']:
+            raise ValueError("❌ Preview sample has no stratum sizes; rebuild it with build_preview_sample().")
+        if self._strata is None:
+            # Stratum of every sampled patient (all their diagnoses are in the sample, so it matches the population)
+            strata = patient_strata(sample['patients'], sample['diagnosis'])
+            self._strata = strata.set_index(sample['patients']['patient_id'])
+        spec = ESTIMATES[name]
+        estimates = stratified_estimates(spec['rows'](sample), spec['keys'], self._strata,
+                                         pd.DataFrame(sample['meta']['strata_sizes']), sample['meta']['fraction'],
+                                         z=self.z)
+        return apply_estimates(result, estimates, spec['keys'], spec['column'], spec['ranked'])
+
+    def __getattr__(self, name):
+        if not name.startswith('get_') or not hasattr(eda, name):
+            raise AttributeError(name)
+        fn = getattr(eda, name)
+        signature = inspect.signature(fn)
+        tables_params = [p for p in signature.parameters if p.startswith('df_')]
+        metric_signature = signature.replace(
+            parameters=[p for p in signature.parameters.values() if p.name not in tables_params])
+
+        def run(*args, **kwargs):
+            # Positional arguments follow the metric's own signature minus its df_<table> parameters,
+            # which can only be overridden by keyword
+            passed = {p: kwargs.pop(p) for p in tables_params if p in kwargs}
+            arguments = dict(metric_signature.bind_partial(*args, **kwargs).arguments)
+            if self.mode == 'preview' and passed:
+                raise ValueError(f"❌ {', '.join(passed)} cannot be passed in preview mode: "
+                                 f"estimates are scaled from the preview sample tables.")
+            tables = self.tables if self.mode == 'exact' else self.preview_sample
+            # Bind every df_<table> argument to the table of the active mode
+            for param in tables_params:
+                arguments[param] = passed[param] if param in passed else tables[param[len('df_'):]]
+            result = fn(**arguments)
+            if self.mode == 'exact' or name not in ESTIMATES:
+                return result
+            if isinstance(result, tuple):
+                return (self.estimate(name, result[0]),) + result[1:]
+            return self.estimate(name, result)
+
+        run.__name__ = name
+        run.__doc__ = fn.__doc__
+        return run
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a stratified preview sample of the processed CSVs.")
+    parser.add_argument("command", choices=["build"], help="Action to run.")
+    parser.add_argument("--data-dir", default=DATA_PROCESSED, help="Directory of the processed CSVs.")
+    parser.add_argument("--out", default=PREVIEW_DIR, help="Directory to save the preview sample in.")
+    parser.add_argument("--fraction", type=float, default=0.05, help="Fraction of patients to keep.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for reproducible samples.")
+    args = parser.parse_args()
+
+    tables = load_all_csv(os.path.join(args.data_dir, "*.csv"))
+    sample = build_preview_sample(tables, fraction=args.fraction, seed=args.seed)
+    save_preview(sample, args.out)
+    meta = sample['meta']
+    print(f"✅ Preview sample with {meta['sample']['patients']} of {meta['population']['patients']} "
+          f"patients saved to '{args.out}'")
+
+
+if __name__ == "__main__":
+    main()
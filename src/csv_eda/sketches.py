@@ -0,0 +1,435 @@
+"""
+sketches.py - Approximate streaming top-N and distinct counts for high-volume metrics.
+
+Exact metrics such as get_common_disease run value_counts over the full
+history. The sketches here are built in one streaming pass over the CSVs,
+use a fixed amount of memory, can be saved, and merge across shards and
+days:
+
+- SpaceSaving keeps the heavy hitters with a per-key overestimation bound.
+- CountMinSketch gives an independent upper bound for any key's count.
+- HyperLogLog counts distinct patients per dimension value.
+
+Every approximate metric returns its error bounds next to the estimate.
+
+Merged sketches must cover disjoint rows, otherwise counts are added twice.
+Build each shard for its own [since, until) window of registration_date
+(patient dimensions) and appointment_date (follow-ups). The window is saved
+with the sketches, and load_sketches refuses to merge overlapping windows.
+
+Usage (from the project root):
+    python -m src.csv_eda.sketches build --since 2026-10-18 --until 2026-10-19 --out outputs/sketches/2026-10-18
+    python -m src.csv_eda.sketches build --since 2026-10-19 --until 2026-10-20 --out outputs/sketches/2026-10-19
+    python -m src.csv_eda.sketches top disease outputs/sketches/2026-10-18 outputs/sketches/2026-10-19
+"""
+
+import argparse
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from clean_and_generate_data import DATA_PROCESSED
+from src.instrumentation import traced
+
+_MASK64 = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def hash_values(values):
+    """Returns a stable 64-bit hash per value (same result across runs, shards and days)."""
+    return pd.util.hash_array(np.asarray(values, dtype=object).astype(str))
+
+
+def _mix64(x):
+    # splitmix64 finalizer, used to derive independent hash functions from one hash
+    with np.errstate(over='ignore'):
+        x = x ^ (x >> np.uint64(30))
+        x = x * np.uint64(0xBF58476D1CE4E5B9)
+        x = x ^ (x >> np.uint64(27))
+        x = x * np.uint64(0x94D049BB133111EB)
+        return x ^ (x >> np.uint64(31))
+
+
+def _bit_length(x):
+    """Vectorized bit length of uint64 values (exact, via two 32-bit halves)."""
+    hi = (x >> np.uint64(32)).astype(np.float64)
+    lo = (x & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    with np.errstate(divide='ignore'):
+        return np.where(hi > 0, 33 + np.floor(np.log2(np.maximum(hi, 1))),
+                        np.where(lo > 0, 1 + np.floor(np.log2(np.maximum(lo, 1))), 0)).astype(np.int64)
+
+
+class CountMinSketch:
+    """Count-min sketch: estimate(key) >= true count, and <= true count + eps * total with probability 1 - delta."""
+
+    def __init__(self, width=2048, depth=5):
+        self.width, self.depth = width, depth
+        self.table = np.zeros((depth, width), dtype=np.int64)
+        self.total = 0
+
+    @property
+    def eps(self):
+        return np.e / self.width
+
+    @property
+    def delta(self):
+        return np.exp(-self.depth)
+
+    def _columns(self, hashes):
+        with np.errstate(over='ignore'):
+            return [(_mix64(hashes + np.uint64(row + 1)) % np.uint64(self.width)).astype(np.int64)
+                    for row in range(self.depth)]
+
+    def update(self, hashes, counts):
+        counts = np.asarray(counts, dtype=np.int64)
+        for row, cols in enumerate(self._columns(hashes)):
+            self.table[row] += np.bincount(cols, weights=counts, minlength=self.width).astype(np.int64)
+        self.total += int(counts.sum())
+
+    def estimate(self, hashes):
+        return np.min([self.table[row, cols] for row, cols in enumerate(self._columns(hashes))], axis=0)
+
+    def merge(self, other):
+        if (self.width, self.depth) != (other.width, other.depth):
+            raise ValueError("❌ Count-min sketches must have the same width and depth to merge.")
+        self.table += other.table
+        self.total += other.total
+
+
+class SpaceSaving:
+    """
+    Mergeable SpaceSaving summary of at most `capacity` keys.
+
+    For a tracked key the true count lies in [count - error, count]; an
+    untracked key occurred at most `floor` times. Errors are bounded by
+    total / capacity.
+    """
+
+    def __init__(self, capacity=1000):
+        self.capacity = capacity
+        self.counters = pd.DataFrame({'count': pd.Series(dtype=np.int64), 'error': pd.Series(dtype=np.int64)})
+        self.floor = 0
+
+    def update_counts(self, counts):
+        """Adds exact counts of one chunk (a Series of key -> count)."""
+        chunk = pd.DataFrame({'count': counts.astype(np.int64), 'error': 0})
+        self._combine(chunk, 0)
+
+    def merge(self, other):
+        self._combine(other.counters, other.floor)
+
+    def _combine(self, counters, floor):
+        # Keys missing on one side may have occurred up to that side's floor
+        left, right = self.counters.align(counters, join='outer')
+        merged = pd.DataFrame({
+            'count': left['count'].fillna(self.floor) + right['count'].fillna(floor),
+            'error': left['error'].fillna(self.floor) + right['error'].fillna(floor),
+        }).astype(np.int64)
+        merged = merged.sort_values('count', ascending=False, kind='stable')
+        dropped = merged.iloc[self.capacity:]
+        self.counters = merged.iloc[:self.capacity]
+        self.floor = max(self.floor + floor, int(dropped['count'].max()) if len(dropped) else 0)
+
+    def top(self, n):
+        return self.counters.head(n)
+
+
+class HyperLogLog:
+    """HyperLogLog distinct counters, one per key, with relative standard error 1.04 / sqrt(2 ** p)."""
+
+    def __init__(self, p=12):
+        self.p = p
+        self.m = 1 << p
+        self.keys = {}
+        self.registers = np.zeros((0, self.m), dtype=np.uint8)
+
+    @property
+    def relative_error(self):
+        return 1.04 / np.sqrt(self.m)
+
+    def _rows(self, keys):
+        codes, uniques = pd.factorize(np.asarray(keys, dtype=object))
+        new = [k for k in uniques if k not in self.keys]
+        for k in new:
+            self.keys[k] = len(self.keys)
+        if new:
+            self.registers = np.vstack([self.registers, np.zeros((len(new), self.m), dtype=np.uint8)])
+        return np.array([self.keys[k] for k in uniques], dtype=np.int64)[codes]
+
+    def update(self, keys, hashes):
+        rows = self._rows(keys)
+        shift = np.uint64(64 - self.p)
+        idx = (hashes >> shift).astype(np.int64)
+        rest = hashes & (_MASK64 >> np.uint64(self.p))
+        rank = (64 - self.p) - _bit_length(rest) + 1
+        flat = self.registers.reshape(-1)
+        np.maximum.at(flat, rows * self.m + idx, rank.astype(np.uint8))
+
+    def estimate(self):
+        """Returns a Series of key -> estimated distinct count."""
+        alpha = 0.7213 / (1 + 1.079 / self.m)
+        registers = self.registers.astype(np.float64)
+        raw = alpha * self.m ** 2 / np.sum(2.0 ** -registers, axis=1)
+        zeros = np.sum(self.registers == 0, axis=1)
+        # Small-range correction (linear counting)
+        with np.errstate(divide='ignore'):
+            linear = self.m * np.log(self.m / np.maximum(zeros, 1))
+        estimate = np.where((raw <= 2.5 * self.m) & (zeros > 0), linear, raw)
+        return pd.Series(estimate, index=list(self.keys), dtype=np.float64)
+
+    def merge(self, other):
+        if self.p != other.p:
+            raise ValueError("❌ HyperLogLog sketches must have the same precision to merge.")
+        rows = self._rows(list(other.keys))
+        np.maximum.at(self.registers, rows, other.registers)
+
+
+class MetricSketch:
+    """Heavy-hitter counts plus distinct patients for one dimension (e.g. disease)."""
+
+    def __init__(self, capacity=1000, width=2048, depth=5, p=12):
+        self.space_saving = SpaceSaving(capacity)
+        self.count_min = CountMinSketch(width, depth)
+        self.distinct = HyperLogLog(p)
+
+    def update(self, keys, patient_ids):
+        """Adds one chunk of rows: the dimension value and patient id of each row."""
+        keys = pd.Series(np.asarray(keys, dtype=object)).astype(str)
+        counts = keys.value_counts()
+        self.space_saving.update_counts(counts)
+        self.count_min.update(hash_values(counts.index), counts.to_numpy())
+        self.distinct.update(keys.to_numpy(), hash_values(patient_ids))
+
+    def merge(self, other):
+        self.space_saving.merge(other.space_saving)
+        self.count_min.merge(other.count_min)
+        self.distinct.merge(other.distinct)
+
+    def top(self, n):
+        """
+        Returns the top n keys with error bounds.
+
+        Returns:
+            - DataFrame: key, count (upper bound), count_low, error, distinct_patients, distinct_error.
+        """
+        # Rank every tracked candidate by its tightest bound, not just the first n counters
+        top = self.space_saving.counters
+        keys = top.index.to_numpy()
+        # Both sketches overestimate, so the smaller one is the tighter upper bound
+        upper = np.minimum(top['count'].to_numpy(), self.count_min.estimate(hash_values(keys)))
+        lower = (top['count'] - top['error']).to_numpy()
+        distinct = self.distinct.estimate().reindex(keys).fillna(0).to_numpy()
+        return pd.DataFrame({
+            'key': keys,
+            'count': upper,
+            'count_low': lower,
+            'error': upper - lower,
+            'distinct_patients': np.round(distinct).astype(np.int64),
+            'distinct_error': np.round(distinct * self.distinct.relative_error).astype(np.int64),
+        }).sort_values('count', ascending=False, kind='stable').head(n).reset_index(drop=True)
+
+    def save(self, path):
+        """Saves the sketch as a compressed .npz file."""
+        ss, hll = self.space_saving, self.distinct
+        meta = {'capacity': ss.capacity, 'floor': ss.floor, 'width': self.count_min.width,
+                'depth': self.count_min.depth, 'total': self.count_min.total, 'p': hll.p}
+        np.savez_compressed(
+            path, meta=json.dumps(meta),
+            ss_keys=ss.counters.index.to_numpy(dtype=str), ss_count=ss.counters['count'].to_numpy(),
+            ss_error=ss.counters['error'].to_numpy(), cms=self.count_min.table,
+            hll_keys=np.array(list(hll.keys), dtype=str), hll_registers=hll.registers,
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            meta = json.loads(str(data['meta']))
+            sketch = cls(meta['capacity'], meta['width'], meta['depth'], meta['p'])
+            sketch.space_saving.counters = pd.DataFrame(
+                {'count': data['ss_count'], 'error': data['ss_error']}, index=data['ss_keys'].astype(object))
+            sketch.space_saving.floor = meta['floor']
+            sketch.count_min.table = data['cms'].copy()
+            sketch.count_min.total = meta['total']
+            sketch.distinct.keys = {k: i for i, k in enumerate(data['hll_keys'].astype(object))}
+            sketch.distinct.registers = data['hll_registers'].copy()
+        return sketch
+
+
+# Dimensions sketched from patients.csv, plus follow-up appointments by disease
+PATIENT_DIMENSIONS = ['disease', 'state', 'city']
+FOLLOW_UP_METRIC = 'follow_up_disease'
+WINDOW_FILE = "window.json"
+
+
+def in_window(dates, since=None, until=None):
+    """Returns a mask of the dates inside [since, until); a missing bound is open."""
+    dates = pd.to_datetime(dates)
+    mask = pd.Series(True, index=dates.index)
+    if since is not None:
+        mask &= dates >= pd.Timestamp(since)
+    if until is not None:
+        mask &= dates < pd.Timestamp(until)
+    return mask
+
+
+@traced
+def build_sketches(data_dir=DATA_PROCESSED, chunksize=100_000, since=None, until=None, **sketch_args):
+    """
+    Builds all metric sketches in one streaming pass over patients.csv and appointments.csv.
+
+    Only patients registered and appointments dated inside [since, until) are
+    counted, so sketches built for disjoint windows can be merged safely.
+
+    Returns:
+        - dict: metric name -> MetricSketch.
+    """
+    sketches = {name: MetricSketch(**sketch_args) for name in PATIENT_DIMENSIONS + [FOLLOW_UP_METRIC]}
+
+    # Patient dimension lookup needed to attribute appointments to a disease (covers all patients)
+    disease_by_patient = []
+    columns = ['patient_id', 'registration_date'] + PATIENT_DIMENSIONS
+    for chunk in pd.read_csv(os.path.join(data_dir, "patients.csv"), usecols=columns, chunksize=chunksize):
+        disease_by_patient.append(chunk.set_index('patient_id')['disease'])
+        chunk = chunk[in_window(chunk['registration_date'], since, until)]
+        for name in PATIENT_DIMENSIONS:
+            sketches[name].update(chunk[name].to_numpy(), chunk['patient_id'].to_numpy())
+    disease_by_patient = pd.concat(disease_by_patient)
+
+    columns = ['patient_id', 'appointment_date', 'follow_up_needed']
+    for chunk in pd.read_csv(os.path.join(data_dir, "appointments.csv"), usecols=columns, chunksize=chunksize):
+        follow_up = chunk[(chunk['follow_up_needed'] == 'Yes') & in_window(chunk['appointment_date'], since, until)]
+        disease = follow_up['patient_id'].map(disease_by_patient)
+        known = disease.notna()
+        sketches[FOLLOW_UP_METRIC].update(disease[known].to_numpy(), follow_up['patient_id'][known].to_numpy())
+    return sketches
+
+
+def save_sketches(sketches, out_dir, since=None, until=None):
+    """Saves each metric sketch as <out_dir>/<metric>.npz, plus the row window they cover."""
+    os.makedirs(out_dir, exist_ok=True)
+    for name, sketch in sketches.items():
+        sketch.save(os.path.join(out_dir, f"{name}.npz"))
+    with open(os.path.join(out_dir, WINDOW_FILE), "w") as f:
+        json.dump({'since': since, 'until': until}, f)
+
+
+def load_window(sketch_dir):
+    """Returns the (since, until) window of a sketch directory as Timestamps (None = open bound)."""
+    try:
+        with open(os.path.join(sketch_dir, WINDOW_FILE)) as f:
+            window = json.load(f)
+    except OSError:
+        window = {}
+    return tuple(pd.Timestamp(window[k]) if window.get(k) else None for k in ('since', 'until'))
+
+
+def check_disjoint(sketch_dirs):
+    """Raises ValueError when two sketch directories cover overlapping row windows."""
+    windows = [(d, *load_window(d)) for d in sketch_dirs]
+    for i, (dir_a, since_a, until_a) in enumerate(windows):
+        for dir_b, since_b, until_b in windows[i + 1:]:
+            # [a, b) and [c, d) overlap unless one ends before the other starts
+            a_before_b = until_a is not None and since_b is not None and until_a <= since_b
+            b_before_a = until_b is not None and since_a is not None and until_b <= since_a
+            if not (a_before_b or b_before_a):
+                raise ValueError(f"❌ Sketches in '{dir_a}' and '{dir_b}' cover overlapping rows; "
+                                 f"build them with disjoint --since/--until windows.")
+
+
+def load_sketches(*sketch_dirs):
+    """Loads and merges the sketches saved in one or more directories (e.g. shards or days)."""
+    check_disjoint(sketch_dirs)
+    merged = {}
+    for sketch_dir in sketch_dirs:
+        for file_name in sorted(os.listdir(sketch_dir)):
+            if not file_name.endswith(".npz"):
+                continue
+            name = file_name[:-len(".npz")]
+            sketch = MetricSketch.load(os.path.join(sketch_dir, file_name))
+            if name in merged:
+                merged[name].merge(sketch)
+            else:
+                merged[name] = sketch
+    return merged
+
+
+# 1. Most common diseases across India (approximate)
+@traced
+def get_common_disease_approx(sketches, top_n):
+    """Returns most common diseases with error bounds.
+
+    Returns:
+        - DataFrame: disease, count, count_low, error, distinct_patients, distinct_error.
+    """
+    return sketches['disease'].top(top_n).rename(columns={'key': 'disease'})
+
+
+# 4. Patient distribution by state (approximate)
+@traced
+def get_patient_distribution_by_state_approx(sketches, top_n):
+    """Returns patient count by state with error bounds.
+
+    Returns:
+        - DataFrame: state, count, count_low, error, distinct_patients, distinct_error.
+    """
+    return sketches['state'].top(top_n).rename(columns={'key': 'state'})
+
+
+# 10. Appointments needing follow-up by disease (approximate)
+@traced
+def get_appointments_needing_follow_up_by_disease_approx(sketches, top_n):
+    """Returns top diseases needing follow-up with error bounds.
+
+    Returns:
+        - DataFrame: disease, follow_up_counts, count_low, error, distinct_patients, distinct_error.
+    """
+    return sketches[FOLLOW_UP_METRIC].top(top_n).rename(columns={'key': 'disease', 'count': 'follow_up_counts'})
+
+
+# SQL q_top_5_cities_with_highest_disease (approximate)
+@traced
+def get_top_cities_approx(sketches, top_n=5):
+    """Returns cities with the most patients with error bounds.
+
+    Returns:
+        - DataFrame: city, no_of_patients, count_low, error, distinct_patients, distinct_error.
+    """
+    return sketches['city'].top(top_n).rename(columns={'key': 'city', 'count': 'no_of_patients'})
+
+
+APPROX_METRICS = {
+    'disease': get_common_disease_approx,
+    'state': get_patient_distribution_by_state_approx,
+    'city': get_top_cities_approx,
+    FOLLOW_UP_METRIC: get_appointments_needing_follow_up_by_disease_approx,
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build or query approximate metric sketches.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build sketches from the processed CSVs.")
+    build.add_argument("--data-dir", default=DATA_PROCESSED, help="Directory of the processed CSVs.")
+    build.add_argument("--out", required=True, help="Directory to save the sketches in, e.g. one per day.")
+    build.add_argument("--chunksize", type=int, default=100_000, help="Rows read per chunk.")
+    build.add_argument("--since", help="Only count rows dated on or after this date (YYYY-MM-DD).")
+    build.add_argument("--until", help="Only count rows dated before this date (YYYY-MM-DD).")
+
+    top = commands.add_parser("top", help="Print an approximate top-N from one or more merged sketch directories.")
+    top.add_argument("metric", choices=list(APPROX_METRICS), help="Metric to query.")
+    top.add_argument("sketch_dirs", nargs="+", help="Sketch directories to merge (shards or days).")
+    top.add_argument("--top-n", type=int, default=10, help="Number of keys to show.")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        sketches = build_sketches(args.data_dir, chunksize=args.chunksize, since=args.since, until=args.until)
+        save_sketches(sketches, args.out, since=args.since, until=args.until)
+        print(f"✅ Sketches saved to '{args.out}'")
+    else:
+        print(APPROX_METRICS[args.metric](load_sketches(*args.sketch_dirs), args.top_n).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
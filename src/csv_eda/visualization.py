@@ -1,11 +1,5 @@
-import seaborn as sns
 import matplotlib.pyplot as plt
-from IPython.core.pylabtools import figsize
-from numpy.ma.core import equal
-
-# Load all datasets and unpack them in a proper sorted order to avoid mismatches
-from src.csv_eda.load_csv import load_all_data
-df_appointments, df_churn_label, df_diagnosis, df_diseases, df_doctors, df_emergency_cases, df_hospitals, df_insurances, df_patients = load_all_data()
+from src.instrumentation import traced
 
 # Import all EDA logic functions used in plotting
 from src.csv_eda.eda import (
@@ -15,139 +9,175 @@ from src.csv_eda.eda import (
     get_patient_distribution_by_state,
     get_patients_registration_trends_over_time,
     get_emergency_cases_type,
-    get_risk_level_vs_age,
+    get_risk_level_age_distribution,
     get_diagnosis_count_per_docter,
     get_hospital_capacity_vs_appointments,
     get_appointments_needing_follow_up_by_disease
 )
 
+# Import the drawing functions shared with the batch renderer
+from src.csv_eda.charts import (
+    draw_common_disease,
+    draw_common_age_group_by_critical_illness,
+    draw_disease_frequency_by_gender,
+    draw_patients_by_state,
+    draw_registration_trends_over_time,
+    draw_emergency_cases_type,
+    draw_risk_level_vs_age,
+    draw_diagnosis_count_per_doctor,
+    draw_hospital_capacity_vs_appointments,
+    draw_appointments_needing_follow_up_by_disease,
+    save_chart,
+    render_charts
+)
+
 # Directory path to save all generated visualization images
 output_path = r"D:\Data Analytics Project\helthcare_analytics_project\outputs\visuals\csv"
 
-def plot_common_disease(df_patients, top_n):
+# Output file name (without extension) and draw function of every chart rendered in batch mode.
+# The pipeline derives the csv_charts stage outputs from these names.
+CHARTS = [
+    ("common_diseases_across_india", draw_common_disease),
+    ("age_group_by_critical_illness", draw_common_age_group_by_critical_illness),
+    ("disease_frequency_by_gender", draw_disease_frequency_by_gender),
+    ("patients_distribution_by_state", draw_patients_by_state),
+    ("registration_trends_over_time", draw_registration_trends_over_time),
+    ("emergency_cases_by_type", draw_emergency_cases_type),
+    ("risk_level_vs_age", draw_risk_level_vs_age),
+    ("diagnosis_per_doctor", draw_diagnosis_count_per_doctor),
+    ("hospital_capacity_vs_appontments", draw_hospital_capacity_vs_appointments),
+    ("appointment_needing_follow_up_by_disease", draw_appointments_needing_follow_up_by_disease),
+]
+CHART_NAMES = [name for name, _ in CHARTS]
+
+@traced
+def plot_common_disease(df_patients, top_n, force=False):
     """Plot top diseases across India."""
     df_top_disease = get_common_disease(df_patients, top_n=top_n)
 
-    plt.figure(figsize=(10, 6))
-    plt.barh(df_top_disease['disease'], df_top_disease['count'], color='skyblue')
-    plt.xlabel('Count')
-    plt.ylabel('Top Diseases')
-    plt.title("Top diseases across India")
-    plt.gca().invert_yaxis()
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/common_diseases_across_india.png", bbox_inches="tight",dpi=300)
+    fig = draw_common_disease(df_top_disease)
+    save_chart(fig, draw_common_disease, df_top_disease,
+               "common_diseases_across_india", output_path, params={'top_n': top_n}, force=force)
     plt.show()
 
-def plot_common_age_group_by_critical_illness(df_diagnosis, df_patients, top_n):
+@traced
+def plot_common_age_group_by_critical_illness(df_diagnosis, df_patients, top_n, force=False):
     """Plot age groups most affected by critical illness."""
     df_common_age_group = get_age_group_affected_by_critical_illness(df_diagnosis, df_patients, top_n=top_n)
 
-    plt.figure(figsize=(10, 6))
-    plt.barh(df_common_age_group['age_group'], df_common_age_group['count'], color='orange')
-    plt.xlabel('Count')
-    plt.ylabel('Age Group')
-    plt.title("Top Age Group By Critical Illness")
-    plt.gca().invert_yaxis()
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/age_group_by_critical_illness.png", bbox_inches="tight",dpi=300)
+    fig = draw_common_age_group_by_critical_illness(df_common_age_group)
+    save_chart(fig, draw_common_age_group_by_critical_illness, df_common_age_group,
+               "age_group_by_critical_illness", output_path, params={'top_n': top_n}, force=force)
     plt.show()
 
-def plot_disease_frequency_by_gender(df_patients, top_n):
+@traced
+def plot_disease_frequency_by_gender(df_patients, top_n, force=False):
     """Plot disease frequency distribution by gender."""
     pivoted = get_disease_frequency_by_gender(df_patients, top_n=top_n)
 
-    pivoted.plot(kind='bar', figsize=(12, 6))
-    plt.xlabel('Disease')
-    plt.ylabel('Count')
-    plt.title("Disease Frequency By Gender")
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/disease_frequency_by_gender.png", bbox_inches="tight",dpi=300)
+    fig = draw_disease_frequency_by_gender(pivoted)
+    save_chart(fig, draw_disease_frequency_by_gender, pivoted,
+               "disease_frequency_by_gender", output_path, params={'top_n': top_n}, force=force)
     plt.show()
 
-def plot_patients_by_state(df_patients, top_n):
+@traced
+def plot_patients_by_state(df_patients, top_n, force=False):
     """Plot patient distribution across top states."""
     patients_by_state = get_patient_distribution_by_state(df_patients, top_n=top_n)
 
-    plt.figure(figsize=(10, 6))
-    patients_by_state.plot(kind='bar')
-    plt.xlabel("State")
-    plt.ylabel("Patient Count")
-    plt.title("Patients Distribution by State")
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/patients_distribution_by_state.png", bbox_inches="tight",dpi=300)
+    fig = draw_patients_by_state(patients_by_state)
+    save_chart(fig, draw_patients_by_state, patients_by_state,
+               "patients_distribution_by_state", output_path, params={'top_n': top_n}, force=force)
     plt.show()
 
-def plot_registration_trends_over_time(df_patients):
+@traced
+def plot_registration_trends_over_time(df_patients, force=False):
     """Plot registration trend of patients over time."""
     registration_trends = get_patients_registration_trends_over_time(df_patients)
 
-    registration_trends.plot(kind='line', marker='o', color='darkorange', figsize=(12, 6))
-    plt.xlabel("Registration Month")
-    plt.ylabel("Patients Count")
-    plt.title("Registration Trends Over Time")
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/registration_trends_over_time.png", bbox_inches="tight",dpi=300)
+    fig = draw_registration_trends_over_time(registration_trends)
+    save_chart(fig, draw_registration_trends_over_time, registration_trends,
+               "registration_trends_over_time", output_path, force=force)
     plt.show()
 
-def plot_emergency_cases_type(df_emergency_cases):
+@traced
+def plot_emergency_cases_type(df_emergency_cases, force=False):
     """Plot emergency cases by severity type."""
     emergency_cases_by_type = get_emergency_cases_type(df_emergency_cases)
 
-    plt.pie(emergency_cases_by_type, labels=emergency_cases_by_type.index, autopct='%1.1f%%', startangle=140)
-    plt.title("Emergency Cases By Severity Type")
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/emergency_cases_by_type.png", bbox_inches="tight",dpi=300)
+    fig = draw_emergency_cases_type(emergency_cases_by_type)
+    save_chart(fig, draw_emergency_cases_type, emergency_cases_by_type,
+               "emergency_cases_by_type", output_path, force=force)
     plt.show()
 
-def plot_risk_level_vs_age(df_patients, df_diagnosis):
+@traced
+def plot_risk_level_vs_age(df_patients, df_diagnosis, force=False):
     """Plot age distribution across risk levels."""
-    merged_df = get_risk_level_vs_age(df_patients, df_diagnosis)
-
-    plt.figure(figsize=(10, 6))
-    sns.violinplot(data=merged_df, x='risk_level', y='age', palette='Set2', hue='gender')
-    plt.title("Risk Level vs. Age")
-    plt.xlabel("Risk Level")
-    plt.ylabel("Age")
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/risk_level_vs_age.png", bbox_inches="tight",dpi=300)
+    # Binned summaries keep plot time independent of the number of diagnoses
+    summary = get_risk_level_age_distribution(df_patients, df_diagnosis)
+
+    fig = draw_risk_level_vs_age(summary)
+    save_chart(fig, draw_risk_level_vs_age, summary,
+               "risk_level_vs_age", output_path, force=force)
     plt.show()
 
-def plot_diagnosis_count_per_doctor(df_doctors, df_appointments, df_diagnosis, top_n):
+@traced
+def plot_diagnosis_count_per_doctor(df_doctors, df_appointments, df_diagnosis, top_n, force=False):
     """Plot diagnosis count for each doctor."""
     diagnosis_per_doctor = get_diagnosis_count_per_docter(df_doctors, df_appointments, df_diagnosis, top_n=top_n)
 
-    diagnosis_per_doctor.plot(kind='bar', figsize=(10, 6))
-    plt.xlabel("Doctor Name")
-    plt.ylabel("Diagnosis Count")
-    plt.title("Diagnosis Count Per Doctor")
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/diagnosis_per_doctor.png", bbox_inches="tight")
+    fig = draw_diagnosis_count_per_doctor(diagnosis_per_doctor)
+    save_chart(fig, draw_diagnosis_count_per_doctor, diagnosis_per_doctor,
+               "diagnosis_per_doctor", output_path, params={'top_n': top_n}, dpi=None, force=force)
     plt.show()
 
-def plot_hospital_capacity_vs_appointments(df_hospitals, df_appointments):
+@traced
+def plot_hospital_capacity_vs_appointments(df_hospitals, df_appointments, force=False):
     """Scatter plot of hospital capacity vs. appointment count."""
     capacity_vs_appointments = get_hospital_capacity_vs_appointments(df_hospitals, df_appointments)
 
-    plt.figure(figsize=(10, 6))
-    # Scatter plot helps visualize the correlation between capacity and appointment load
-    plt.scatter(data=capacity_vs_appointments, x='capacity', y='count', alpha=0.7, color='teal')
-    plt.title("Hospital Capacity Vs Appointments")
-    plt.xlabel("Hospital Capacity")
-    plt.ylabel("Appointment Count")
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/hospital_capacity_vs_appontments.png", bbox_inches="tight",dpi=300)
+    fig = draw_hospital_capacity_vs_appointments(capacity_vs_appointments)
+    save_chart(fig, draw_hospital_capacity_vs_appointments, capacity_vs_appointments,
+               "hospital_capacity_vs_appontments", output_path, force=force)
     plt.show()
 
-def plot_appointments_needing_follow_up_by_disease(df_appointments, df_patients, top_n):
+@traced
+def plot_appointments_needing_follow_up_by_disease(df_appointments, df_patients, top_n, force=False):
     """Plot diseases needing follow-up appointments."""
     follow_up_counts = get_appointments_needing_follow_up_by_disease(df_appointments, df_patients, top_n=top_n)
 
-    plt.figure(figsize=(10, 6))
-    plt.barh(follow_up_counts['disease'], follow_up_counts['follow_up_counts'], color='orange')
-    plt.xlabel("Disease")
-    plt.ylabel("Follow Up Count")
-    plt.title("Appointment Needing Follow Up by Disease")
-    plt.gca().invert_yaxis()
-    plt.tight_layout()
-    plt.savefig(f"{output_path}/appointment_needing_follow_up_by_disease.png", bbox_inches="tight",dpi=300)
+    fig = draw_appointments_needing_follow_up_by_disease(follow_up_counts)
+    save_chart(fig, draw_appointments_needing_follow_up_by_disease, follow_up_counts,
+               "appointment_needing_follow_up_by_disease", output_path, params={'top_n': top_n}, force=force)
     plt.show()
+
+@traced
+def build_chart_jobs(df_appointments, df_diagnosis, df_doctors, df_emergency_cases, df_hospitals, df_patients, top_n):
+    """Returns one render job per chart, each holding only its aggregated data and plot parameters."""
+    # Aggregated data and plot parameters keyed by draw function
+    data = {
+        draw_common_disease: (get_common_disease(df_patients, top_n=top_n), {'top_n': top_n}),
+        draw_common_age_group_by_critical_illness:
+            (get_age_group_affected_by_critical_illness(df_diagnosis, df_patients, top_n=top_n), {'top_n': top_n}),
+        draw_disease_frequency_by_gender: (get_disease_frequency_by_gender(df_patients, top_n=top_n), {'top_n': top_n}),
+        draw_patients_by_state: (get_patient_distribution_by_state(df_patients, top_n=top_n), {'top_n': top_n}),
+        draw_registration_trends_over_time: (get_patients_registration_trends_over_time(df_patients), None),
+        draw_emergency_cases_type: (get_emergency_cases_type(df_emergency_cases), None),
+        draw_risk_level_vs_age: (get_risk_level_age_distribution(df_patients, df_diagnosis), None),
+        draw_diagnosis_count_per_doctor:
+            (get_diagnosis_count_per_docter(df_doctors, df_appointments, df_diagnosis, top_n=top_n), {'top_n': top_n}),
+        draw_hospital_capacity_vs_appointments:
+            (get_hospital_capacity_vs_appointments(df_hospitals, df_appointments), None),
+        draw_appointments_needing_follow_up_by_disease:
+            (get_appointments_needing_follow_up_by_disease(df_appointments, df_patients, top_n=top_n),
+             {'top_n': top_n}),
+    }
+    return [{'name': name, 'draw': draw, 'data': data[draw][0], 'params': data[draw][1]} for name, draw in CHARTS]
+
+@traced
+def render_all_charts(df_appointments, df_diagnosis, df_doctors, df_emergency_cases, df_hospitals, df_patients,
+                      top_n=10, output_dir=output_path, fmt="png", dpi=300, max_workers=None, force=False):
+    """Render every chart headless in parallel, skipping charts whose inputs have not changed."""
+    jobs = build_chart_jobs(df_appointments, df_diagnosis, df_doctors, df_emergency_cases, df_hospitals,
+                            df_patients, top_n=top_n)
+    return render_charts(jobs, output_dir, fmt=fmt, dpi=dpi, max_workers=max_workers, force=force)
@@ -0,0 +1,258 @@
+"""
+instrumentation.py - Opt-in profiling spans for the healthcare analytics project.
+
+Functions decorated with @traced (and blocks wrapped in `with span(...)`)
+record wall time, CPU time, peak RSS delta and input/output row counts per
+call. Spans nest, so a run shows where the time went from the top-level
+script down to each metric. Events are written in the Chrome trace event
+format, which chrome://tracing, Perfetto and speedscope can open.
+
+Tracing is disabled by default; the decorator then only checks a flag.
+Enable it for a run with the HEALTHCARE_TRACE environment variable:
+
+    HEALTHCARE_TRACE=outputs/trace.json python -m src.csv_eda.main_csv_analysis --batch
+
+and print the top offenders of a trace file with:
+
+    python -m src.instrumentation outputs/trace.json --top 15
+"""
+
+import argparse
+import atexit
+import functools
+import json
+import os
+import sys
+import threading
+import time
+from contextlib import contextmanager
+
+try:
+    import resource  # Not available on Windows; RSS deltas are then reported as 0
+except ImportError:
+    resource = None
+
+TRACE_ENV = "HEALTHCARE_TRACE"
+# Set by the process that enabled tracing so worker processes do not overwrite its trace file
+TRACE_OWNER_ENV = "HEALTHCARE_TRACE_OWNER"
+
+_enabled = False
+_trace_path = None
+_owner_pid = None
+_events = []
+_lock = threading.Lock()
+_local = threading.local()
+
+
+def enable(path):
+    """Start recording spans in this process and write them to `path` at exit."""
+    global _enabled, _trace_path, _owner_pid
+    if _owner_pid is None:
+        atexit.register(flush)
+    _enabled, _trace_path, _owner_pid = True, path, os.getpid()
+    os.environ[TRACE_OWNER_ENV] = str(_owner_pid)
+
+
+def disable():
+    """Stop recording spans (already recorded events are kept)."""
+    global _enabled
+    _enabled = False
+
+
+def is_enabled():
+    return _enabled
+
+
+def _peak_rss_mb():
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes on Linux
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
+
+
+def count_rows(value):
+    """Returns the number of rows in a DataFrame/Series/array or a collection of them (None if not tabular)."""
+    shape = getattr(value, "shape", None)
+    if shape:
+        return int(shape[0])
+    if isinstance(value, dict):
+        value = list(value.values())
+    if isinstance(value, (list, tuple)):
+        counts = [count_rows(v) for v in value]
+        counts = [c for c in counts if c is not None]
+        return sum(counts) if counts else None
+    return None
+
+
+def _stack():
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    return stack
+
+
+@contextmanager
+def span(name, rows_in=None, **args):
+    """
+    Records a nested span around a block of code.
+
+    Yields a dict; setting its 'rows_out' key records the output row count.
+    """
+    info = {}
+    if not _enabled:
+        yield info
+        return
+
+    stack = _stack()
+    frame = {'child_s': 0.0}
+    stack.append(frame)
+    rss_start = _peak_rss_mb()
+    cpu_start = time.thread_time()
+    wall_start = time.perf_counter()
+    ts_us = time.time() * 1e6
+    try:
+        yield info
+    finally:
+        wall = time.perf_counter() - wall_start
+        cpu = time.thread_time() - cpu_start
+        stack.pop()
+        if stack:
+            stack[-1]['child_s'] += wall
+        event = {
+            'name': name, 'cat': 'healthcare', 'ph': 'X',
+            'ts': ts_us, 'dur': wall * 1e6,
+            'pid': os.getpid(), 'tid': threading.get_ident(),
+            'args': {
+                'wall_ms': wall * 1e3,
+                # Children recorded from parallel workers can overlap, so self time is floored at zero
+                'self_ms': max(wall - frame['child_s'], 0.0) * 1e3,
+                'cpu_ms': cpu * 1e3,
+                'peak_rss_delta_mb': _peak_rss_mb() - rss_start,
+                'rows_in': rows_in,
+                'rows_out': info.get('rows_out'),
+                'depth': len(stack),
+                **args,
+            },
+        }
+        with _lock:
+            _events.append(event)
+
+
+def record_span(name, start, wall, cpu=0.0, rows_in=None, rows_out=None, pid=None, tid=None, **args):
+    """
+    Records a span measured elsewhere, e.g. in a worker process that does not write a trace.
+
+    `start` is a time.time() timestamp; `wall` and `cpu` are in seconds. The
+    span is nested under the span currently open in this thread.
+    """
+    if not _enabled:
+        return
+    stack = _stack()
+    if stack:
+        stack[-1]['child_s'] += wall
+    event = {
+        'name': name, 'cat': 'healthcare', 'ph': 'X',
+        'ts': start * 1e6, 'dur': wall * 1e6,
+        'pid': pid or os.getpid(), 'tid': tid or threading.get_ident(),
+        'args': {
+            'wall_ms': wall * 1e3,
+            'self_ms': wall * 1e3,
+            'cpu_ms': cpu * 1e3,
+            'peak_rss_delta_mb': 0.0,
+            'rows_in': rows_in,
+            'rows_out': rows_out,
+            'depth': len(stack),
+            **args,
+        },
+    }
+    with _lock:
+        _events.append(event)
+
+
+def traced(fn=None, *, name=None):
+    """Decorator recording a span per call; near-zero overhead while tracing is disabled."""
+    if fn is None:
+        return functools.partial(traced, name=name)
+    span_name = name or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not _enabled:
+            return fn(*args, **kwargs)
+        with span(span_name, rows_in=count_rows(list(args) + list(kwargs.values()))) as info:
+            result = fn(*args, **kwargs)
+            info['rows_out'] = count_rows(result)
+            return result
+
+    return wrapper
+
+
+def events():
+    """Returns a copy of the spans recorded so far."""
+    with _lock:
+        return list(_events)
+
+
+def flush(path=None):
+    """Writes the recorded spans as a Chrome trace file (only from the process that enabled tracing)."""
+    path = path or _trace_path
+    if path is None or os.getpid() != _owner_pid:
+        return
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    with open(path, "w") as f:
+        json.dump({'traceEvents': events(), 'displayTimeUnit': 'ms'}, f)
+
+
+def summarize(trace_events, top=15, sort_by="self_ms"):
+    """
+    Aggregates spans by name.
+
+    Returns:
+        - list: one dict per span name (calls, wall_ms, self_ms, cpu_ms, peak_rss_delta_mb, rows_in),
+          sorted by `sort_by` descending and limited to `top` entries.
+    """
+    totals = {}
+    for event in trace_events:
+        args = event.get('args', {})
+        row = totals.setdefault(event['name'], {'name': event['name'], 'calls': 0, 'wall_ms': 0.0,
+                                                'self_ms': 0.0, 'cpu_ms': 0.0, 'peak_rss_delta_mb': 0.0,
+                                                'rows_in': 0})
+        row['calls'] += 1
+        row['wall_ms'] += args.get('wall_ms', event.get('dur', 0) / 1e3)
+        row['self_ms'] += args.get('self_ms', 0.0)
+        row['cpu_ms'] += args.get('cpu_ms', 0.0)
+        row['peak_rss_delta_mb'] = max(row['peak_rss_delta_mb'], args.get('peak_rss_delta_mb', 0.0))
+        row['rows_in'] += args.get('rows_in') or 0
+    return sorted(totals.values(), key=lambda r: r[sort_by], reverse=True)[:top]
+
+
+def print_summary(trace_events, top=15, sort_by="self_ms"):
+    """Prints the top offenders of a trace as a table."""
+    print(f"{'span':<55} {'calls':>6} {'wall ms':>11} {'self ms':>11} {'cpu ms':>11} {'rss +MB':>8} {'rows in':>11}")
+    for r in summarize(trace_events, top=top, sort_by=sort_by):
+        print(f"{r['name']:<55} {r['calls']:>6} {r['wall_ms']:>11.1f} {r['self_ms']:>11.1f} "
+              f"{r['cpu_ms']:>11.1f} {r['peak_rss_delta_mb']:>8.1f} {r['rows_in']:>11}")
+
+
+# Enable from the environment, but only in the process that started the run
+if os.getenv(TRACE_ENV) and os.getenv(TRACE_OWNER_ENV) in (None, str(os.getpid())):
+    enable(os.getenv(TRACE_ENV))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a healthcare analytics trace file.")
+    parser.add_argument("trace", help="Trace file written with HEALTHCARE_TRACE.")
+    parser.add_argument("--top", type=int, default=15, help="Number of spans to show.")
+    parser.add_argument("--sort", default="self_ms", choices=["self_ms", "wall_ms", "cpu_ms", "peak_rss_delta_mb"],
+                        help="Column used to rank the spans.")
+    args = parser.parse_args()
+
+    with open(args.trace) as f:
+        trace = json.load(f)
+    print_summary(trace.get('traceEvents', trace), top=args.top, sort_by=args.sort)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+"""
+pipeline.py - Single entry point for the end-to-end healthcare analytics flow.
+
+The manual script order (clean_and_generate_data.py, import_csv.py,
+main_csv_analysis.py, main_sql_analysis.py) is modelled as a DAG:
+
+    tables ──┬──> csv_charts
+             └──> sql_import ──> sql_charts
+
+Independent stages run concurrently (e.g. the SQL import alongside the CSV
+EDA) as soon as their dependencies finish. A stage is skipped when the
+content hashes of its inputs (data files and the code that processes them)
+match the last successful run and its outputs still exist. Hashes are kept
+in a state file; files whose size and mtime are unchanged are not re-read,
+so a no-op refresh is near-instant. Inside csv_charts the render manifest
+additionally skips charts whose aggregated data did not change.
+
+Usage (from the project root):
+    python -m src.pipeline            # refresh whatever is stale
+    python -m src.pipeline --dry-run  # show which stages would run
+    python -m src.pipeline --force    # rebuild everything
+    python -m src.pipeline --scale 0.1  # regenerate the tables at 10% of the default row counts
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+from clean_and_generate_data import DATA_RAW, DATA_PROCESSED
+from src.csv_eda import visualization as csv_visualization
+from src.instrumentation import span
+from src.sql_eda import visualization as sql_visualization
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+STATE_PATH = os.path.join(PROJECT_ROOT, "outputs", "pipeline_state.json")
+
+# Tables written by the generator (diseases.csv is one of its inputs)
+GENERATED_TABLES = ["appointments", "churn_label", "diagnosis", "doctors", "emergency_cases", "hospitals",
+                    "insurances", "patients"]
+
+
+def _source(*parts):
+    return os.path.join(PROJECT_ROOT, *parts)
+
+
+def build_stages(config):
+    """
+    Returns the pipeline DAG as stage name -> stage dict.
+
+    Each stage has 'deps' (stage names), 'inputs' and 'outputs' (file paths),
+    optional 'params' that also invalidate it when changed, and 'run' (a
+    callable taking the shared PipelineContext).
+    """
+    processed = config['data_processed']
+    tables = [os.path.join(processed, f"{t}.csv") for t in GENERATED_TABLES]
+    all_tables = tables + [os.path.join(processed, "diseases.csv")]
+    chart_params = {'fmt': config['fmt'], 'dpi': config['dpi'], 'top_n': config['top_n']}
+
+    return {
+        'tables': {
+            'deps': [],
+            'inputs': [os.path.join(config['data_raw'], "HospitalsInIndia.csv"),
+                       os.path.join(processed, "diseases.csv"),
+                       _source("clean_and_generate_data.py")],
+            'outputs': tables,
+            # A different scale regenerates the tables (the default is left out so existing state stays valid)
+            'params': {'scale': config['scale']} if config['scale'] != 1.0 else {},
+            # Existing data (generated at the default scale) is adopted on the first run instead of being regenerated
+            'adopt_existing': config['scale'] == 1.0,
+            'run': run_generate,
+        },
+        'csv_charts': {
+            'deps': ['tables'],
+            'inputs': all_tables + [_source("src", "csv_eda", name) for name in
+                                    ("load_csv.py", "eda.py", "charts.py", "visualization.py")],
+            'outputs': [os.path.join(config['csv_output'], f"{name}.{config['fmt']}") for name in
+                        csv_visualization.CHART_NAMES],
+            'params': chart_params,
+            'run': run_csv_charts,
+        },
+        'sql_import': {
+            'deps': ['tables'],
+            'inputs': all_tables + [_source("src", "sql_eda", "import_csv.py")],
+            'outputs': [],
+            'run': run_sql_import,
+        },
+        'sql_charts': {
+            'deps': ['sql_import'],
+            'inputs': all_tables + [_source("src", "sql_eda", name) for name in
+                                    ("queries.py", "visualization.py")] + [_source("src", "csv_eda", "charts.py")],
+            'outputs': [os.path.join(config['sql_output'], f"top_5_cities_with_highest_diseases.{config['fmt']}")],
+            'params': chart_params,
+            'run': run_sql_charts,
+        },
+    }
+
+
+class PipelineContext:
+    """Configuration plus resources shared between concurrently running stages."""
+
+    def __init__(self, config):
+        self.config = config
+        self._tables = None
+        self._lock = threading.Lock()
+
+    def tables(self):
+        """Loads the processed CSVs once and shares them between stages."""
+        from src.csv_eda.load_csv import load_all_data
+        with self._lock:
+            if self._tables is None:
+                names = ["appointments", "churn_label", "diagnosis", "diseases", "doctors", "emergency_cases",
+                         "hospitals", "insurances", "patients"]
+                loaded = load_all_data(os.path.join(self.config['data_processed'], "*.csv"))
+                self._tables = dict(zip(names, loaded))
+            return self._tables
+
+
+def run_generate(ctx):
+    from clean_and_generate_data import generate_all_data
+    generate_all_data(ctx.config['data_raw'], ctx.config['data_processed'], scale=ctx.config['scale'])
+
+
+def run_csv_charts(ctx):
+    t = ctx.tables()
+    csv_visualization.render_all_charts(
+        t['appointments'], t['diagnosis'], t['doctors'], t['emergency_cases'], t['hospitals'], t['patients'],
+        top_n=ctx.config['top_n'], output_dir=ctx.config['csv_output'], fmt=ctx.config['fmt'],
+        dpi=ctx.config['dpi'], force=ctx.config['force'])
+
+
+def run_sql_import(ctx):
+    from src.sql_eda.db_connection import get_ingine
+    from src.sql_eda.import_csv import import_tables
+    import_tables(ctx.tables(), get_ingine())
+
+
+def run_sql_charts(ctx):
+    from src.sql_eda.queries import q_top_5_cities_with_highest_disease
+    from src.sql_eda.query_runner import run_query
+    df_cities = run_query(q_top_5_cities_with_highest_disease)
+    if df_cities.empty:
+        raise RuntimeError("❌ Top cities query returned no rows.")
+    sql_visualization.render_sql_charts(df_cities, output_dir=ctx.config['sql_output'], fmt=ctx.config['fmt'],
+                                        dpi=ctx.config['dpi'], force=ctx.config['force'])
+
+
+def file_digest(path, cache):
+    """Returns the sha256 of a file, reusing the cached hash while its size and mtime are unchanged."""
+    stat = os.stat(path)
+    key = os.path.abspath(path)
+    cached = cache.get(key)
+    if cached and cached[0] == stat.st_size and cached[1] == stat.st_mtime_ns:
+        return cached[2]
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    cache[key] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+    return cache[key][2]
+
+
+def load_state(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {'stages': {}, 'files': {}}
+
+
+def save_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def input_hashes(stage, file_cache):
+    """Returns path -> content hash for a stage's inputs (None for missing files) plus its parameters."""
+    hashes = {path: file_digest(path, file_cache) if os.path.exists(path) else None for path in stage['inputs']}
+    hashes['params'] = json.dumps(stage.get('params', {}), sort_keys=True)
+    return hashes
+
+
+def is_up_to_date(name, stage, state, hashes, force=False):
+    """A stage is up to date when its input hashes match the last successful run and its outputs exist."""
+    if force:
+        return False
+    outputs_exist = all(os.path.exists(path) for path in stage['outputs'])
+    recorded = state['stages'].get(name)
+    if recorded is None:
+        return stage.get('adopt_existing', False) and bool(stage['outputs']) and outputs_exist
+    return recorded == hashes and outputs_exist
+
+
+def run_pipeline(config, max_workers=4, dry_run=False):
+    """
+    Runs every stale stage of the DAG, starting each one as soon as its dependencies have finished.
+
+    Returns:
+        - dict: stage name and status ('skipped', 'done', 'failed', 'blocked' or 'stale' for dry runs).
+    """
+    stages = build_stages(config)
+    state = load_state(config['state_path'])
+    state.setdefault('stages', {})
+    state.setdefault('files', {})
+    ctx = PipelineContext(config)
+    state_lock = threading.Lock()
+    status = {}
+    start = time.perf_counter()
+
+    def execute(name):
+        stage = stages[name]
+        # A stale dependency would regenerate this stage's inputs, so a dry run cannot judge it on current files
+        if dry_run and any(status[dep] == 'stale' for dep in stage['deps']):
+            return 'stale', 0.0
+        with state_lock:
+            hashes = input_hashes(stage, state['files'])
+            if is_up_to_date(name, stage, state, hashes, force=config['force']):
+                if name not in state['stages']:
+                    state['stages'][name] = hashes
+                return 'skipped', 0.0
+        if dry_run:
+            return 'stale', 0.0
+
+        stage_start = time.perf_counter()
+        with span(f"pipeline.{name}"):
+            stage['run'](ctx)
+        with state_lock:
+            # Upstream outputs are this stage's inputs, so hash them again after the run
+            state['stages'][name] = input_hashes(stage, state['files'])
+            save_state(config['state_path'], state)
+        return 'done', time.perf_counter() - stage_start
+
+    remaining = dict(stages)
+    running = {}
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        while remaining or running:
+            # Start every stage whose dependencies have all finished
+            for name, stage in list(remaining.items()):
+                dep_status = [status.get(dep) for dep in stage['deps']]
+                if any(s in ('failed', 'blocked') for s in dep_status):
+                    status[name] = 'blocked'
+                    print(f"⛔ {name}: blocked by a failed dependency")
+                    del remaining[name]
+                elif all(s in ('skipped', 'done', 'stale') for s in dep_status):
+                    running[pool.submit(execute, name)] = name
+                    del remaining[name]
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                try:
+                    status[name], elapsed = future.result()
+                except Exception as e:
+                    status[name], elapsed = 'failed', 0.0
+                    print(f"❌ {name}: {e}")
+                    continue
+                icon = {'skipped': '⏭️', 'done': '✅', 'stale': '🔄'}[status[name]]
+                print(f"{icon} {name}: {status[name]}" + (f" in {elapsed:.2f}s" if status[name] == 'done' else ""))
+
+    if not dry_run:
+        with state_lock:
+            save_state(config['state_path'], state)
+    print(f"🎉 Pipeline finished in {time.perf_counter() - start:.2f}s")
+    return status
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the healthcare analytics pipeline, skipping up-to-date stages.")
+    parser.add_argument("--data-raw", default=DATA_RAW, help="Directory holding HospitalsInIndia.csv.")
+    parser.add_argument("--data-processed", default=DATA_PROCESSED, help="Directory of the generated CSV tables.")
+    parser.add_argument("--csv-output", default=csv_visualization.output_path, help="Directory for the CSV charts.")
+    parser.add_argument("--sql-output", default=sql_visualization.output_path, help="Directory for the SQL charts.")
+    parser.add_argument("--scale", type=float, default=1.0,
+                        help="Row count scale factor used when the tables are regenerated (e.g. 0.1 for a quick run).")
+    parser.add_argument("--state", default=STATE_PATH, help="File holding the content hashes of the last run.")
+    parser.add_argument("--format", default="png", help="Chart image format.")
+    parser.add_argument("--dpi", type=int, default=300, help="Chart resolution.")
+    parser.add_argument("--top-n", type=int, default=10, help="top_n used by the charts.")
+    parser.add_argument("--workers", type=int, default=4, help="Maximum number of stages running at once.")
+    parser.add_argument("--force", action="store_true", help="Run every stage even if it is up to date.")
+    parser.add_argument("--dry-run", action="store_true", help="Only report which stages are stale.")
+    args = parser.parse_args()
+
+    config = {
+        'data_raw': args.data_raw,
+        'data_processed': args.data_processed,
+        'csv_output': args.csv_output,
+        'sql_output': args.sql_output,
+        'state_path': args.state,
+        'scale': args.scale,
+        'fmt': args.format,
+        'dpi': args.dpi,
+        'top_n': args.top_n,
+        'force': args.force,
+    }
+    status = run_pipeline(config, max_workers=args.workers, dry_run=args.dry_run)
+    if any(s == 'failed' for s in status.values()):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
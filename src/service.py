@@ -0,0 +1,348 @@
+"""
+service.py - Long-running local analytics service for EDA metrics and SQL insights.
+
+Loads the processed CSV tables once and keeps them, plus every computed
+metric, resident in memory. Dashboards query it over HTTP/JSON on
+localhost instead of running a script that reloads everything per request:
+
+    GET  /health                    tables, row counts and load time
+    GET  /metrics                   available eda.py metrics
+    GET  /metrics/<get_name>?top_n=10
+    GET  /insights                  available queries.py insights
+    GET  /insights/<q_name>
+    POST /reload                    check the CSVs for changes right away
+
+Requests are served concurrently, including cold computations of different
+metrics and slow SQL insights; repeated requests are answered from an LRU
+result cache in milliseconds. A background thread watches the CSV files and
+reloads only the tables whose files changed, dropping just the cached
+results that depend on them.
+
+Usage (from the project root):
+    python -m src.service --port 8765
+    curl "http://127.0.0.1:8765/metrics/get_common_disease?top_n=5"
+"""
+
+import argparse
+import glob
+import inspect
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pandas as pd
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from clean_and_generate_data import DATA_PROCESSED
+from src.csv_eda import eda
+from src.instrumentation import span
+
+# Metrics precomputed at start-up and after every reload (the dashboard defaults)
+WARM_PARAMS = {'top_n': 10}
+# Query parameters clients may set (tuning arguments such as grid_size keep their defaults)
+EXPOSED_PARAMS = {'top_n'}
+MAX_TOP_N = 1000
+# Row-level metrics are served on demand only (get_risk_level_age_distribution is the summarized form)
+WARM_EXCLUDE = {'get_risk_level_vs_age'}
+
+
+def to_json(result):
+    """Converts a metric/query result (DataFrame, Series or tuple of them) to JSON-ready data."""
+    if isinstance(result, tuple):
+        return [to_json(part) for part in result]
+    if isinstance(result, pd.Series):
+        result = result.rename(result.name or 'count').reset_index()
+    if isinstance(result, pd.DataFrame):
+        frame = result.reset_index() if not isinstance(result.index, pd.RangeIndex) else result
+        frame.columns = [str(c) for c in frame.columns]
+        return json.loads(frame.to_json(orient='records', date_format='iso'))
+    return result
+
+
+class AnalyticsStore:
+    """Resident tables plus an LRU cache of serialized metric and insight results."""
+
+    def __init__(self, data_dir, cache_size=256):
+        self.data_dir = data_dir
+        self.cache_size = cache_size
+        self.tables = {}
+        self.signatures = {}
+        self.loaded_at = None
+        # Bumped on every reload; results computed from older tables are returned but not cached
+        self.generation = 0
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._cache_lock = threading.Lock()
+        self._reload_lock = threading.Lock()
+        self.metrics = {name: fn for name, fn in vars(eda).items() if name.startswith('get_') and callable(fn)}
+
+    def metric_tables(self, name):
+        """Returns the table names a metric reads (from its df_<table> parameters)."""
+        return {p[len('df_'):] for p in inspect.signature(self.metrics[name]).parameters if p.startswith('df_')}
+
+    def _depends_on(self, key, changed):
+        kind, name, _ = key
+        # SQL tables are imported from the same CSVs, so any change invalidates the insights
+        return kind == 'insight' or bool(self.metric_tables(name) & changed)
+
+    def refresh(self):
+        """
+        Reloads the CSVs whose size or mtime changed and drops the cached results depending on them.
+
+        Returns:
+            - list: names of the reloaded tables.
+        """
+        with self._reload_lock:
+            changed = {}
+            for path in glob.glob(os.path.join(self.data_dir, "*.csv")):
+                name = os.path.basename(path)[:-len(".csv")]
+                stat = os.stat(path)
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if self.signatures.get(name) != signature:
+                    with span(f"service.load.{name}"):
+                        changed[name] = (pd.read_csv(path), signature)
+            if not changed:
+                return []
+
+            # Swap in a new dict so requests in flight keep a consistent snapshot
+            tables = dict(self.tables)
+            for name, (df, signature) in changed.items():
+                tables[name] = df
+                self.signatures[name] = signature
+            with self._cache_lock:
+                self.tables = tables
+                self.loaded_at = time.time()
+                self.generation += 1
+                for key in [k for k in self._cache if self._depends_on(k, set(changed))]:
+                    del self._cache[key]
+                # Later requests must not wait for results computed from the old tables
+                for key in [k for k in self._inflight if self._depends_on(k, set(changed))]:
+                    del self._inflight[key]
+        print(f"🔄 Reloaded tables: {', '.join(sorted(changed))}")
+        return sorted(changed)
+
+    def warm(self):
+        """Precomputes every metric with the dashboard default parameters."""
+        for name in self.metrics:
+            if name in WARM_EXCLUDE:
+                continue
+            try:
+                self.metric(name, self._params_for(name, WARM_PARAMS))
+            except Exception as e:
+                print(f"⚠️ Could not precompute '{name}': {e}")
+
+    def _params_for(self, name, params):
+        accepted = inspect.signature(self.metrics[name]).parameters
+        return {k: v for k, v in params.items() if k in accepted}
+
+    def metric_params(self, name, query):
+        """
+        Validates query parameters against a metric's signature.
+
+        Raises ValueError (answered with 400) for unknown, malformed, out of
+        range, unexpected or missing parameters.
+
+        Returns:
+            - dict: parameter name -> int value.
+        """
+        unknown = set(query) - EXPOSED_PARAMS
+        if unknown:
+            raise ValueError(f"❌ Unknown parameter(s): {', '.join(sorted(unknown))}")
+        params = {k: int(v) for k, v in query.items()}
+        if 'top_n' in params and not 1 <= params['top_n'] <= MAX_TOP_N:
+            raise ValueError(f"❌ top_n must be between 1 and {MAX_TOP_N}")
+
+        signature = inspect.signature(self.metrics[name])
+        signature = signature.replace(parameters=[p for p in signature.parameters.values()
+                                                  if not p.name.startswith('df_')])
+        try:
+            signature.bind(**params)
+        except TypeError as e:
+            raise ValueError(f"❌ {name}: {e}")
+        return params
+
+    def _cached(self, key, compute):
+        """
+        Returns the cached payload for key, computing it with compute(tables) on a miss.
+
+        Concurrent requests for the same key share one computation; different
+        keys compute in parallel.
+        """
+        with self._cache_lock:
+            if key in self._cache:
+                self._cache.move_to_end(key)
+                return self._cache[key], True
+            future = self._inflight.get(key)
+            if future is None:
+                future = self._inflight[key] = Future()
+                tables, generation = self.tables, self.generation
+                owner = True
+            else:
+                owner = False
+        if not owner:
+            return future.result()
+
+        try:
+            result = compute(tables)
+            payload = json.dumps(to_json(result)).encode()
+        except BaseException as e:
+            with self._cache_lock:
+                if self._inflight.get(key) is future:
+                    del self._inflight[key]
+            future.set_exception(e)
+            raise
+
+        with self._cache_lock:
+            if self._inflight.get(key) is future:
+                del self._inflight[key]
+            # A reload during the computation means the result may already be stale
+            if generation == self.generation:
+                self._cache[key] = payload
+                while len(self._cache) > self.cache_size:
+                    self._cache.popitem(last=False)
+        future.set_result((payload, False))
+        return payload, False
+
+    def metric(self, name, params):
+        """Returns the serialized result of eda.<name> and whether it came from the cache."""
+        fn = self.metrics[name]
+
+        def compute(tables):
+            kwargs = dict(params)
+            for param in inspect.signature(fn).parameters:
+                if param.startswith('df_'):
+                    kwargs[param] = tables[param[len('df_'):]]
+            return fn(**kwargs)
+
+        key = ('metric', name, tuple(sorted(params.items())))
+        with span(f"service.metric.{name}"):
+            return self._cached(key, compute)
+
+    def insight(self, name, queries):
+        """Returns the serialized result of a queries.py insight and whether it came from the cache."""
+        from src.sql_eda.query_runner import get_engine
+
+        def compute(tables):
+            # Not run_query: it turns database errors into an empty frame, which would hide an outage
+            engine = get_engine()
+            if engine is None:
+                raise ConnectionError("❌ Could not establish connection to PostgreSQL.")
+            return pd.read_sql_query(text(queries[name]), engine)
+
+        key = ('insight', name, ())
+        with span(f"service.insight.{name}"):
+            return self._cached(key, compute)
+
+
+def make_handler(store, queries):
+    class Handler(BaseHTTPRequestHandler):
+
+        def _send(self, status, body):
+            if not isinstance(body, bytes):
+                body = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _respond(self, name, kind, payload, cached, start, params=None):
+            elapsed_ms = (time.perf_counter() - start) * 1e3
+            body = (b'{"' + kind.encode() + b'": ' + json.dumps(name).encode()
+                    + b', "params": ' + json.dumps(params or {}).encode()
+                    + b', "cached": ' + json.dumps(cached).encode()
+                    + b', "elapsed_ms": ' + json.dumps(round(elapsed_ms, 3)).encode()
+                    + b', "data": ' + payload + b'}')
+            self._send(200, body)
+
+        def do_GET(self):
+            start = time.perf_counter()
+            url = urlparse(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            try:
+                if parts == ["health"]:
+                    self._send(200, {'status': 'ok', 'loaded_at': store.loaded_at,
+                                     'tables': {name: len(df) for name, df in store.tables.items()}})
+                elif parts == ["metrics"]:
+                    self._send(200, sorted(store.metrics))
+                elif parts == ["insights"]:
+                    self._send(200, sorted(queries))
+                elif len(parts) == 2 and parts[0] == "metrics" and parts[1] in store.metrics:
+                    query = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                    params = store.metric_params(parts[1], query)
+                    payload, cached = store.metric(parts[1], params)
+                    self._respond(parts[1], 'metric', payload, cached, start, params)
+                elif len(parts) == 2 and parts[0] == "insights" and parts[1] in queries:
+                    payload, cached = store.insight(parts[1], queries)
+                    self._respond(parts[1], 'insight', payload, cached, start)
+                else:
+                    self._send(404, {'error': f"Unknown path '{url.path}'"})
+            except ValueError as e:
+                self._send(400, {'error': str(e)})
+            except (ConnectionError, OperationalError) as e:
+                self._send(503, {'error': f"Database unavailable: {e}"})
+            except Exception as e:
+                self._send(500, {'error': str(e)})
+
+        def do_POST(self):
+            if urlparse(self.path).path.strip("/") == "reload":
+                self._send(200, {'reloaded': store.refresh()})
+            else:
+                self._send(404, {'error': f"Unknown path '{self.path}'"})
+
+        def log_message(self, format, *args):
+            # Keep the console for reload messages; per-request logging costs more than a cached answer
+            pass
+
+    return Handler
+
+
+def watch(store, interval):
+    """Polls the CSV files and reloads changed tables, re-warming the dashboard defaults."""
+    while True:
+        time.sleep(interval)
+        try:
+            if store.refresh():
+                store.warm()
+        except Exception as e:
+            print(f"❌ Reload failed: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve EDA metrics and SQL insights from memory over HTTP/JSON.")
+    parser.add_argument("--data-dir", default=DATA_PROCESSED, help="Directory of the processed CSVs.")
+    parser.add_argument("--host", default="127.0.0.1", help="Interface to bind (localhost only by default).")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on.")
+    parser.add_argument("--reload-interval", type=float, default=5.0,
+                        help="Seconds between checks for changed CSV files (0 disables hot reload).")
+    parser.add_argument("--cache-size", type=int, default=256,
+                        help="Maximum number of cached results (least recently used are evicted first).")
+    args = parser.parse_args()
+
+    from src.sql_eda import queries as query_module
+    queries = {name: sql for name, sql in vars(query_module).items() if name.startswith('q_')}
+
+    store = AnalyticsStore(args.data_dir, cache_size=args.cache_size)
+    store.refresh()
+    store.warm()
+    if args.reload_interval > 0:
+        threading.Thread(target=watch, args=(store, args.reload_interval), daemon=True).start()
+
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(store, queries))
+    print(f"✅ Serving healthcare analytics on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("👋 Shutting down.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,24 @@
-from query_runner import run_query
-from queries import *
-from src.sql_eda.visualization import plot_bar_city
+import argparse
 
-df_cities=run_query(q_top_5_cities_with_highest_disease)
-plot_bar_city(df_cities)
\ No newline at end of file
+from src.instrumentation import traced
+from src.sql_eda.query_runner import run_query
+from src.sql_eda.queries import *
+from src.sql_eda.visualization import plot_bar_city, render_sql_charts
+
+@traced
+def main():
+    parser=argparse.ArgumentParser(description="Run SQL insights and plot their charts.")
+    parser.add_argument("--batch", action="store_true", help="Render charts headless (no plt.show()).")
+    parser.add_argument("--format", default="png", help="Output image format for batch mode.")
+    parser.add_argument("--dpi", type=int, default=300, help="Output resolution for batch mode.")
+    parser.add_argument("--force", action="store_true", help="Re-render charts even if their inputs are unchanged.")
+    args=parser.parse_args()
+
+    df_cities=run_query(q_top_5_cities_with_highest_disease)
+    if args.batch:
+        render_sql_charts(df_cities, fmt=args.format, dpi=args.dpi, force=args.force)
+    else:
+        plot_bar_city(df_cities, force=args.force)
+
+if __name__ == "__main__":
+    main()
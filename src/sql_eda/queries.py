@@ -9,10 +9,6 @@ Project: Healthcare Analytics
 """
 
 import pandas as pd
-from db_connection import get_ingine
-
-# Establish connection to the database
-engine = get_ingine()
 
 # 1. 🔍 Top 5 cities with the highest number of patients
 q_top_5_cities_with_highest_disease = """
@@ -133,7 +129,8 @@ JOIN churn_label c ON p.patient_id = c.patient_id;
 """
 
 # Sample usage in Python:
-# df = pd.read_sql_query(q_top_5_cities_with_highest_disease, engine)
+# from src.sql_eda.query_runner import run_query
+# df = run_query(q_top_5_cities_with_highest_disease)
 # print(df)
 # correlation = df['churn'].corr(df['insurance'])
 # print(f'Correlation between insurance and churn: {correlation:.2f}')
@@ -1,11 +1,21 @@
-from db_connection import get_ingine
+from src.sql_eda.db_connection import get_ingine
 import pandas as pd
 from sqlalchemy import text
-engine=get_ingine()
+from src.instrumentation import traced
 
-def run_query(query):
+# Connection is opened on first use instead of at import time
+engine=None
+
+def get_engine():
+    global engine
+    if engine is None:
+        engine=get_ingine()
+    return engine
+
+@traced
+def run_query(query, engine=None):
     try:
-        return pd.read_sql_query(text(query),engine)
+        return pd.read_sql_query(text(query),engine or get_engine())
     except Exception as e:
         print("❌ Error during SQL query:")
         print(f"{e}")
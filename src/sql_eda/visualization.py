@@ -1,16 +1,29 @@
 import matplotlib.pyplot as plt
-import seaborn as sns
-from IPython.core.pylabtools import figsize
+from src.instrumentation import traced
+
+from src.csv_eda.charts import save_chart, render_charts
 
 output_path=r"D:\Data Analytics Project\helthcare_analytics_project\outputs\visuals\sql"
 
-def plot_bar_city(df):
-    plt.figure(figsize(10,6))
+def draw_bar_city(df):
+    fig=plt.figure(figsize=(10,6))
     plt.bar(df['city'],df['no_of_patients'],color='b')
     plt.xlabel('City')
     plt.ylabel('Disease Count')
     plt.title('Top 5 cities by Disease Count')
     plt.tight_layout()
-    plt.savefig(f'{output_path}/top_5_cities_with_highest_diseases.png', bbox_inches="tight",dpi=300)
+    return fig
+
+@traced
+def plot_bar_city(df, force=False):
+    fig=draw_bar_city(df)
+    save_chart(fig,draw_bar_city,df,'top_5_cities_with_highest_diseases',output_path,force=force)
     plt.show()
 
+@traced
+def render_sql_charts(df_cities, output_dir=output_path, fmt="png", dpi=300, max_workers=None, force=False):
+    """Render the SQL insight charts headless, skipping charts whose inputs have not changed."""
+    jobs=[
+        {'name':'top_5_cities_with_highest_diseases','draw':draw_bar_city,'data':df_cities},
+    ]
+    return render_charts(jobs, output_dir, fmt=fmt, dpi=dpi, max_workers=max_workers, force=force)
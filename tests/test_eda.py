@@ -0,0 +1,56 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+
+from src.csv_eda.charts import draw_risk_level_vs_age
+from src.csv_eda.eda import get_risk_level_age_distribution
+
+
+def make_tables(n_patients=500, n_diagnoses=2000, seed=0):
+    rng = np.random.default_rng(seed)
+    patient_ids = [f"PATE{i:05d}" for i in range(n_patients)]
+    df_patients = pd.DataFrame({
+        'patient_id': patient_ids,
+        'age': rng.integers(0, 100, n_patients),
+        'gender': rng.choice(['Male', 'Female'], n_patients),
+    })
+    df_diagnosis = pd.DataFrame({
+        'diagnosis_id': np.arange(n_diagnoses),
+        'patient_id': rng.choice(patient_ids, n_diagnoses),
+        'risk_level': rng.choice(['High', 'Medium', 'Low'], n_diagnoses),
+    })
+    return df_patients, df_diagnosis
+
+
+def test_risk_level_age_distribution_matches_raw_rows():
+    df_patients, df_diagnosis = make_tables()
+    cut = 2
+    stats, density = get_risk_level_age_distribution(df_patients, df_diagnosis, cut=cut)
+    merged = pd.merge(df_patients, df_diagnosis, on='patient_id')
+    grid = density.columns.to_numpy(dtype=float)
+
+    assert list(stats.index.get_level_values('risk_level').unique()) == ['Low', 'Medium', 'High']
+    for (risk_level, gender), ages in merged.groupby(['risk_level', 'gender'])['age']:
+        ages = ages.to_numpy(dtype=float)
+        row = stats.loc[(risk_level, gender)]
+        assert row['count'] == len(ages)
+        np.testing.assert_allclose([row['q1'], row['median'], row['q3']], np.percentile(ages, [25, 50, 75]),
+                                   atol=1e-9)
+        np.testing.assert_allclose(row['std'], ages.std(ddof=1), atol=1e-9)
+
+        # Exact Gaussian KDE over the raw ages with Scott's rule bandwidth
+        bw = ages.std(ddof=1) * len(ages) ** (-1 / 5)
+        kernel = np.exp(-0.5 * ((grid[:, None] - ages[None, :]) / bw) ** 2) / (bw * np.sqrt(2 * np.pi))
+        expected = kernel.mean(axis=1)
+        expected[(grid < ages.min() - cut * bw) | (grid > ages.max() + cut * bw)] = 0
+        np.testing.assert_allclose(density.loc[(risk_level, gender)].to_numpy(), expected, atol=1e-12)
+
+
+def test_risk_level_age_distribution_without_rows():
+    df_patients, df_diagnosis = make_tables()
+    df_diagnosis['risk_level'] = np.nan
+    for diagnosis in (df_diagnosis, df_diagnosis.iloc[:0]):
+        stats, density = get_risk_level_age_distribution(df_patients, diagnosis)
+        assert stats.empty and density.empty
+        # The chart still renders as an empty axis
+        plt.close(draw_risk_level_vs_age((stats, density)))
@@ -0,0 +1,74 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.csv_eda import preview
+from src.csv_eda.preview import EDASession, build_preview_sample
+
+
+def make_tables(n_patients=3000, seed=0):
+    rng = np.random.default_rng(seed)
+    patient_ids = [f"PATE{i:05d}" for i in range(n_patients)]
+    df_patients = pd.DataFrame({
+        'patient_id': patient_ids,
+        'age': rng.integers(0, 100, n_patients),
+        'gender': rng.choice(['Male', 'Female'], n_patients),
+        'disease': rng.choice(['Flu', 'Asthma', 'Malaria', 'Diabetes'], n_patients),
+        'state': rng.choice(['Goa', 'Delhi', 'Kerala'], n_patients),
+        'registration_date': '2025-01-01',
+    })
+    df_doctors = pd.DataFrame({'doctor_id': [f"DOCT{i}" for i in range(20)],
+                               'doctor_name': [f"Doctor {i}" for i in range(20)]})
+    # Patients have very different numbers of appointments, so rows are strongly clustered by patient
+    visits = rng.geometric(0.2, n_patients)
+    df_appointments = pd.DataFrame({
+        'appointment_id': np.arange(visits.sum()),
+        'patient_id': np.repeat(patient_ids, visits),
+        'doctor_id': np.repeat(rng.choice(df_doctors['doctor_id'], n_patients), visits),
+        'follow_up_needed': rng.choice(['Yes', 'No'], visits.sum()),
+    })
+    n_diagnoses = n_patients // 2
+    df_diagnosis = pd.DataFrame({
+        'diagnosis_id': np.arange(n_diagnoses),
+        'patient_id': rng.choice(patient_ids, n_diagnoses),
+        'risk_level': rng.choice(['High', 'Medium', 'Low'], n_diagnoses),
+    })
+    return {'patients': df_patients, 'doctors': df_doctors, 'appointments': df_appointments,
+            'diagnosis': df_diagnosis}
+
+
+def test_positional_arguments_and_table_overrides():
+    tables = make_tables(500)
+    session = EDASession(tables, build_preview_sample(tables, fraction=0.2))
+    assert len(session.preview().get_common_disease(2)) == 2
+    assert len(session.exact().get_common_disease(3)) == 3
+    with pytest.raises(ValueError):
+        session.preview().get_common_disease(3, df_patients=tables['patients'])
+
+
+def test_full_sample_reproduces_exact_counts():
+    tables = make_tables(500)
+    session = EDASession(tables, build_preview_sample(tables, fraction=1.0))
+    estimate = session.preview().get_diagnosis_count_per_docter(5)
+    exact = session.exact().get_diagnosis_count_per_docter(5)
+    assert (estimate['estimate'] == exact.reindex(estimate.index)).all()
+    assert (estimate['ci_low'] == estimate['ci_high']).all()
+
+
+def test_cluster_intervals_cover_exact_counts():
+    tables = make_tables()
+    spec = preview.ESTIMATES['get_diagnosis_count_per_docter']
+    exact = spec['rows'](tables).groupby(spec['keys']).size()
+    exact.index = preview._key_index(exact.index.to_frame(index=False))
+
+    covered = []
+    for seed in range(30):
+        sample = build_preview_sample(tables, fraction=0.2, seed=seed)
+        strata = preview.patient_strata(sample['patients'], sample['diagnosis'])
+        strata = strata.set_index(sample['patients']['patient_id'])
+        estimates = preview.stratified_estimates(spec['rows'](sample), spec['keys'], strata,
+                                                 pd.DataFrame(sample['meta']['strata_sizes']), 0.2)
+        estimates = estimates.reindex(exact.index).fillna(0)
+        covered.append(((estimates['ci_low'] <= exact) & (exact <= estimates['ci_high'])).mean())
+    # Nominal 95%; row-level (unclustered) intervals cover far less on this data
+    assert np.mean(covered) > 0.85
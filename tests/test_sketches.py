@@ -0,0 +1,75 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.csv_eda.sketches import HyperLogLog, MetricSketch, check_disjoint, hash_values, save_sketches
+
+
+def make_rows(n, n_keys, seed):
+    rng = np.random.default_rng(seed)
+    # Zipf-like key popularity so there are clear heavy hitters
+    weights = 1 / np.arange(1, n_keys + 1)
+    keys = rng.choice([f"key_{i}" for i in range(n_keys)], size=n, p=weights / weights.sum())
+    patient_ids = rng.integers(0, n // 2, size=n).astype(str)
+    return keys, patient_ids
+
+
+def build(keys, patient_ids, chunks, **sketch_args):
+    sketch = MetricSketch(**sketch_args)
+    for key_chunk, id_chunk in zip(np.array_split(keys, chunks), np.array_split(patient_ids, chunks)):
+        sketch.update(key_chunk, id_chunk)
+    return sketch
+
+
+def test_merge_equals_single_pass():
+    keys, patient_ids = make_rows(20_000, 50, seed=1)
+    single = build(keys, patient_ids, chunks=1)
+
+    half = len(keys) // 2
+    merged = build(keys[:half], patient_ids[:half], chunks=3)
+    merged.merge(build(keys[half:], patient_ids[half:], chunks=2))
+
+    # Capacity above the number of keys keeps SpaceSaving exact, and CMS / HLL merges are lossless
+    pd.testing.assert_frame_equal(merged.top(50), single.top(50))
+    np.testing.assert_array_equal(merged.count_min.table, single.count_min.table)
+    pd.testing.assert_series_equal(merged.distinct.estimate().sort_index(), single.distinct.estimate().sort_index())
+
+    exact = pd.Series(keys).value_counts()
+    top = single.top(50).set_index('key')
+    assert (top['count'] == exact.reindex(top.index)).all()
+
+
+def test_space_saving_bounds_hold_after_merge():
+    keys, patient_ids = make_rows(50_000, 500, seed=2)
+    shards = [build(k, p, chunks=4, capacity=40) for k, p in zip(np.array_split(keys, 5),
+                                                                   np.array_split(patient_ids, 5))]
+    merged = shards[0]
+    for shard in shards[1:]:
+        merged.merge(shard)
+
+    exact = pd.Series(keys).value_counts()
+    top = merged.top(10).set_index('key')
+    true_counts = exact.reindex(top.index).fillna(0)
+    assert (true_counts <= top['count']).all()
+    assert (true_counts >= top['count_low']).all()
+    # The heaviest keys are found despite evictions
+    assert set(exact.index[:5]) <= set(top.index)
+
+
+def test_hyperloglog_error():
+    hll = HyperLogLog(p=12)
+    n = 100_000
+    ids = np.arange(n).astype(str)
+    # Every id appears twice, which must not change the estimate
+    hll.update(np.full(2 * n, 'all'), hash_values(np.concatenate([ids, ids])))
+    estimate = hll.estimate()['all']
+    assert abs(estimate - n) / n < 3 * hll.relative_error
+
+
+def test_overlapping_windows_are_rejected(tmp_path):
+    for name, since, until in [('a', None, '2026-10-19'), ('b', '2026-10-19', None), ('c', '2026-10-18', None)]:
+        save_sketches({}, tmp_path / name, since=since, until=until)
+
+    check_disjoint([tmp_path / 'a', tmp_path / 'b'])
+    with pytest.raises(ValueError):
+        check_disjoint([tmp_path / 'a', tmp_path / 'c'])